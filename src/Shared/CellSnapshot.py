@@ -0,0 +1,70 @@
+import threading
+import numpy as np
+
+class CellSnapshot:
+    # read-only copy of the cell columns, call release() once it is no longer read
+    def __init__(self, lock):
+        self._lock = lock
+        self._readers = 0
+        self._buffers = {}
+        self.columns = {}
+        self.cellCount = 0
+        self.stepNumber = 0
+        self.worldVersion = 0
+
+    def __len__(self):
+        return self.cellCount
+
+    def _fill(self, columns, mask, cellCount):
+        for name, column in columns.items():
+            buffer = self._buffers.get(name)
+            if buffer is None or len(buffer) < cellCount:
+                buffer = np.empty((max(cellCount + cellCount // 2, 1024),) + column.shape[1:], dtype=column.dtype)
+                self._buffers[name] = buffer
+            view = buffer[:cellCount]
+            if mask is None:
+                view[:] = column
+            else:
+                np.compress(mask, column, axis=0, out=view)
+            view.flags.writeable = False
+            self.columns[name] = view
+        self.cellCount = cellCount
+
+    def release(self):
+        with self._lock:
+            self._readers -= 1
+
+class SnapshotPublisher:
+    # captures a snapshot only when one is asked for and the world changed since the last capture,
+    # captureFunction(snapshot) fills the snapshot from the live world and is called between steps
+    def __init__(self, captureFunction):
+        self._captureFunction = captureFunction
+        self._lock = threading.Lock()
+        self._published = None
+        self._spare = None
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    def get(self):
+        if self._stale:
+            self._capture()
+        with self._lock:
+            snapshot = self._published
+            snapshot._readers += 1
+        return snapshot
+
+    def _capture(self):
+        # two snapshots are reused in turn, a fresh one is only allocated while a renderer still reads the spare
+        with self._lock:
+            snapshot = self._spare
+            if snapshot == None or snapshot._readers > 0:
+                snapshot = CellSnapshot(self._lock)
+
+        self._captureFunction(snapshot)
+        self._stale = False
+
+        with self._lock:
+            self._spare = self._published
+            self._published = snapshot
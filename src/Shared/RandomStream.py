@@ -0,0 +1,53 @@
+import numpy as np
+
+class RandomStream:
+    # seeded per environment, draws are served from pre-drawn batches so a brain never pays for a generator call
+    BATCH_SIZE = 4096
+
+    def __init__(self, seed = None):
+        self.seed(seed)
+
+    def seed(self, seed = None):
+        self.generator = np.random.default_rng(seed)
+        self._batches = {}
+
+    def _refill(self, valueRange, count):
+        # valueRange None stands for uniforms in [0, 1), otherwise an inclusive (low, high) integer range
+        if valueRange == None:
+            values = self.generator.random(max(self.BATCH_SIZE, count))
+        else:
+            values = self.generator.integers(valueRange[0], valueRange[1] + 1, max(self.BATCH_SIZE, count))
+        batch = [values.tolist(), 0]
+        self._batches[valueRange] = batch
+        return batch
+
+    def random(self):
+        batch = self._batches.get(None)
+        if batch == None or batch[1] == len(batch[0]):
+            batch = self._refill(None, 1)
+        value = batch[0][batch[1]]
+        batch[1] += 1
+        return value
+
+    def randint(self, low, high):
+        # inclusive like random.randint
+        batch = self._batches.get((low, high))
+        if batch == None or batch[1] == len(batch[0]):
+            batch = self._refill((low, high), 1)
+        value = batch[0][batch[1]]
+        batch[1] += 1
+        return value
+
+    def randoms(self, count):
+        return self._take(None, count)
+
+    def randints(self, low, high, count):
+        return self._take((low, high), count)
+
+    def _take(self, valueRange, count):
+        batch = self._batches.get(valueRange)
+        if batch == None or batch[1] + count > len(batch[0]):
+            batch = self._refill(valueRange, count)
+        position = batch[1]
+        batch[1] += count
+        return batch[0][position:position + count]
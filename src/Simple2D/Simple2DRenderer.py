@@ -1,10 +1,20 @@
 from io import BytesIO
-from PIL import Image, ImageDraw
+from PIL import Image
 from base_classes.Renderer import Renderer
 from ExportFunctions import ExportFunction, ControlElement
 import math
+import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 class Simple2DRenderer(Renderer):
+    # encodings the GUI can decode; "raw", "image" and "array" are for in-process consumers via setOutputEncoding
+    DISPLAY_ENCODINGS = ("png", "png-palette", "png-fast", "bmp")
+    OUTPUT_ENCODINGS = DISPLAY_ENCODINGS + ("raw", "image", "array")
+    DIRTY_BLOCK_PIXELS = 64
+    DIRTY_BLOCK_LIMIT = 64
+    MIN_SCALE = 1 / 1024
+
     def __init__(self, outputResolutionW, outputResolutionH):
         super().__init__(outputResolutionW, outputResolutionH)
         self._scale = 16
@@ -19,12 +29,60 @@ class Simple2DRenderer(Renderer):
             ExportFunction(self._moveRight, "Move right", ControlElement.REPEATINGBUTTON, [10]),
             ExportFunction(self._zoomIn, "Zoom in", ControlElement.BUTTON),
             ExportFunction(self._zoomOut, "Zoom out", ControlElement.BUTTON),
-            ExportFunction(self._setMoveSpeed, "Camera speed", ControlElement.SLIDER, [1, 25, 1])            
+            ExportFunction(self._setMoveSpeed, "Camera speed", ControlElement.SLIDER, [1, 25, 1]),
+            ExportFunction(self._setOutputEncodingIndex, "Output encoding", ControlElement.SLIDER, [0, len(Simple2DRenderer.DISPLAY_ENCODINGS) - 1, 0]),
+            ExportFunction(self._setPngCompressLevel, "PNG compression", ControlElement.SLIDER, [0, 9, 6])
         ]
 
         self._backgroundColor = (0, 0, 0)
+        self._cellSource = None
+        self._frameBuffer = None
+        self._frameState = None
+        self._frameLeftBound = 0
+        self._frameTopBound = 0
+        self._cachedFrameKey = None
+        self._cachedFrame = None
+        self._outputEncoding = "png"
+        self._pngCompressLevel = 6
+        self._renderWorker = None
+        self._renderLock = threading.Lock()
 
     def render(self, simple2DCellList):
+        # renderAsync draws on a worker thread, the lock keeps it and direct calls from sharing the frame caches mid-frame
+        with self._renderLock:
+            return self._renderCached(simple2DCellList)
+
+    def _renderCached(self, simple2DCellList):
+        # "image" and "array" outputs can be modified by the caller, so only encoded bytes are reused
+        frameKey = None
+        worldVersion = None
+        if hasattr(simple2DCellList, "columns"):
+            worldVersion = simple2DCellList.worldVersion
+        elif self._cellSource != None:
+            worldVersion = self._cellSource.getWorldVersion()
+        if worldVersion != None and self._outputEncoding not in ("image", "array"):
+            frameKey = (worldVersion, self._scale, self._xCenterPosition, self._yCenterPosition, self.outputResolutionW, self.outputResolutionH, tuple(self._backgroundColor), self._outputEncoding, self._pngCompressLevel)
+            if frameKey == self._cachedFrameKey:
+                return self._cachedFrame
+
+        outputFrame = self._renderFrame(simple2DCellList)
+        self._cachedFrameKey = frameKey
+        self._cachedFrame = outputFrame if frameKey != None else None
+        return outputFrame
+
+    def renderAsync(self, snapshot):
+        # renders a snapshot from getSnapshot() on a worker thread while the simulation keeps stepping, the snapshot is released once drawn
+        if self._renderWorker == None:
+            self._renderWorker = ThreadPoolExecutor(max_workers=1)
+        return self._renderWorker.submit(self._renderSnapshot, snapshot)
+
+    def _renderSnapshot(self, snapshot):
+        try:
+            return self.render(snapshot)
+        finally:
+            snapshot.release()
+
+    def _renderFrame(self, simple2DCellList):
         outputBaseWidth = self.outputResolutionW
         outputBaseHeight = self.outputResolutionH
 
@@ -33,35 +91,249 @@ class Simple2DRenderer(Renderer):
         gridLeftBound = self._xCenterPosition - outputBaseWidth / (2 * self._scale)
         gridRightBound = self._xCenterPosition + outputBaseWidth / (2 * self._scale)
 
-        outputImage = Image.new("RGB", (outputBaseWidth, outputBaseHeight), color = self._backgroundColor)
-        outputImageDraw = ImageDraw.Draw(outputImage)
-        if outputImageDraw is None:
-            return None
-        
-        for cell in simple2DCellList:
-            if gridLeftBound - self._scale <= cell.cellData["xPosition"] <= gridRightBound + self._scale and gridTopBound - self._scale <= cell.cellData["yPosition"] <= gridBottomBound + self._scale:
-                topLeftX = min(outputBaseWidth - 1, max(0, math.floor(((cell.cellData["xPosition"] - gridLeftBound) * self._scale))))
-                topLeftY = min(outputBaseHeight - 1, max(0, math.floor(((cell.cellData["yPosition"] - gridTopBound) * self._scale))))
+        # snapshots are drawn from their own arrays, the live environment may already be stepping again
+        cellSource = None if hasattr(simple2DCellList, "columns") else self._cellSource
+
+        if self._scale < 1:
+            self._frameBuffer = None
+            return self._encodeImage(Image.fromarray(self._renderZoomedOut(simple2DCellList, cellSource, gridLeftBound, gridTopBound, gridRightBound, gridBottomBound, outputBaseWidth, outputBaseHeight)))
+
+        if cellSource != None and self._outputEncoding != "png-palette":
+            outputArray = self._renderIncremental(gridLeftBound, gridTopBound, gridRightBound, gridBottomBound, outputBaseWidth, outputBaseHeight)
+            return self._encodeImage(Image.fromarray(outputArray))
+
+        self._frameBuffer = None
+        if cellSource != None:
+            simple2DCellList = cellSource.getCellsInArea(math.floor(gridLeftBound), math.floor(gridTopBound), math.floor(gridRightBound), math.floor(gridBottomBound))
+        xPositions, yPositions, colors = self._gatherCells(simple2DCellList)
+
+        outputImage = None
+        if self._outputEncoding == "png-palette":
+            outputImage = self._rasterizePalette(xPositions, yPositions, colors, gridLeftBound, gridTopBound, outputBaseWidth, outputBaseHeight)
+        if outputImage == None:
+            outputArray = self._rasterize(xPositions, yPositions, colors, self._getBackgroundArray(), gridLeftBound, gridTopBound, outputBaseWidth, outputBaseHeight)
+            outputImage = Image.fromarray(outputArray)
+
+        return self._encodeImage(outputImage)
+
+    def _renderIncremental(self, gridLeftBound, gridTopBound, gridRightBound, gridBottomBound, outputWidth, outputHeight):
+        # the environment logs every position it spawned, deleted, moved or recolored since the last call
+        changedPositions = self._cellSource.takeChangedPositions()
+        backgroundArray = self._getBackgroundArray()
+        frameState = (self._scale, outputWidth, outputHeight, tuple(backgroundArray.tolist()))
+
+        fullRedraw = self._frameBuffer is None or changedPositions == None or frameState != self._frameState
+        if not fullRedraw:
+            xShift = (self._frameLeftBound - gridLeftBound) * self._scale
+            yShift = (self._frameTopBound - gridTopBound) * self._scale
+            xPixelShift = round(xShift)
+            yPixelShift = round(yShift)
+            if abs(xShift - xPixelShift) > 1e-6 or abs(yShift - yPixelShift) > 1e-6 or abs(xPixelShift) >= outputWidth or abs(yPixelShift) >= outputHeight:
+                fullRedraw = True
+
+        self._frameState = frameState
+        self._frameLeftBound = gridLeftBound
+        self._frameTopBound = gridTopBound
+
+        if fullRedraw:
+            self._frameBuffer = self._renderArea(gridLeftBound, gridTopBound, 0, 0, outputWidth, outputHeight)
+            return self._frameBuffer
+
+        frameBuffer = self._frameBuffer
+        if xPixelShift != 0 or yPixelShift != 0:
+            shiftedBuffer = np.empty_like(frameBuffer)
+            shiftedBuffer[max(0, yPixelShift):outputHeight + min(0, yPixelShift), max(0, xPixelShift):outputWidth + min(0, xPixelShift)] = frameBuffer[max(0, -yPixelShift):outputHeight + min(0, -yPixelShift), max(0, -xPixelShift):outputWidth + min(0, -xPixelShift)]
+            frameBuffer = shiftedBuffer
+            self._frameBuffer = frameBuffer
+
+            # only the strips the pan exposed need cells drawn into them, plus one block along both edges
+            # because a cell at the frame edge can turn into a skipped one pixel sliver or stop being one
+            if xPixelShift != 0:
+                leftWidth = min(outputWidth, max(0, xPixelShift) + self._scale)
+                rightWidth = min(outputWidth, max(0, -xPixelShift) + self._scale)
+                frameBuffer[:, :leftWidth] = self._renderArea(gridLeftBound, gridTopBound, 0, 0, leftWidth, outputHeight)
+                frameBuffer[:, outputWidth - rightWidth:] = self._renderArea(gridLeftBound, gridTopBound, outputWidth - rightWidth, 0, rightWidth, outputHeight)
+            if yPixelShift != 0:
+                topHeight = min(outputHeight, max(0, yPixelShift) + self._scale)
+                bottomHeight = min(outputHeight, max(0, -yPixelShift) + self._scale)
+                frameBuffer[:topHeight, :] = self._renderArea(gridLeftBound, gridTopBound, 0, 0, outputWidth, topHeight)
+                frameBuffer[outputHeight - bottomHeight:, :] = self._renderArea(gridLeftBound, gridTopBound, 0, outputHeight - bottomHeight, outputWidth, bottomHeight)
+
+        if len(changedPositions) == 0:
+            return frameBuffer
+
+        changedArray = np.array(list(changedPositions), dtype=np.int64).reshape(-1, 2)
+        visible = (changedArray[:, 0] >= math.floor(gridLeftBound)) & (changedArray[:, 0] <= math.floor(gridRightBound)) & (changedArray[:, 1] >= math.floor(gridTopBound)) & (changedArray[:, 1] <= math.floor(gridBottomBound))
+
+        # changes are repainted in blocks of roughly 64x64 pixels
+        blockSize = max(1, Simple2DRenderer.DIRTY_BLOCK_PIXELS // self._scale)
+        dirtyBlocks = np.unique(changedArray[visible] // blockSize, axis=0)
+        if len(dirtyBlocks) > Simple2DRenderer.DIRTY_BLOCK_LIMIT:
+            self._frameBuffer = self._renderArea(gridLeftBound, gridTopBound, 0, 0, outputWidth, outputHeight)
+            return self._frameBuffer
+
+        for blockX, blockY in dirtyBlocks.tolist():
+            pixelLeft = max(0, math.floor((blockX * blockSize - gridLeftBound) * self._scale))
+            pixelTop = max(0, math.floor((blockY * blockSize - gridTopBound) * self._scale))
+            pixelRight = min(outputWidth, math.floor(((blockX + 1) * blockSize - gridLeftBound) * self._scale))
+            pixelBottom = min(outputHeight, math.floor(((blockY + 1) * blockSize - gridTopBound) * self._scale))
+            if pixelLeft >= pixelRight or pixelTop >= pixelBottom:
+                continue
+            frameBuffer[pixelTop:pixelBottom, pixelLeft:pixelRight] = self._renderArea(gridLeftBound, gridTopBound, pixelLeft, pixelTop, pixelRight - pixelLeft, pixelBottom - pixelTop)
+        return frameBuffer
 
-                bottomRightX = min(outputBaseWidth - 1, max(0, math.floor(((cell.cellData["xPosition"] - gridLeftBound) * self._scale) + self._scale - 1)))
-                bottomRightY = min(outputBaseHeight - 1, max(0, math.floor(((cell.cellData["yPosition"] - gridTopBound) * self._scale) + self._scale - 1)))
+    def _renderZoomedOut(self, simple2DCellList, cellSource, gridLeftBound, gridTopBound, gridRightBound, gridBottomBound, outputWidth, outputHeight):
+        # every pixel stands for a 2^level x 2^level block and shows the mean color of the cells inside it
+        level = round(-math.log2(self._scale))
+        blockLeft = math.floor(gridLeftBound) >> level
+        blockTop = math.floor(gridTopBound) >> level
 
-                if (topLeftX == bottomRightX or topLeftY == bottomRightY) and self._scale != 1:
-                    continue
+        if cellSource != None and hasattr(cellSource, "getOccupancyArea"):
+            occupancy = cellSource.getOccupancyArea(level, blockLeft, blockTop, outputWidth, outputHeight)
+        else:
+            if cellSource != None:
+                simple2DCellList = cellSource.getCellsInArea(math.floor(gridLeftBound), math.floor(gridTopBound), math.floor(gridRightBound), math.floor(gridBottomBound))
+            xPositions, yPositions, colors = self._gatherCells(simple2DCellList)
+            blockX = (xPositions >> level) - blockLeft
+            blockY = (yPositions >> level) - blockTop
+            visible = (blockX >= 0) & (blockX < outputWidth) & (blockY >= 0) & (blockY < outputHeight)
+            occupancy = np.zeros((outputHeight, outputWidth, 4), dtype=np.int64)
+            np.add.at(occupancy, (blockY[visible], blockX[visible]), np.concatenate((np.ones((np.count_nonzero(visible), 1), dtype=np.int64), colors[visible]), axis=1))
 
-                if topLeftX > bottomRightX or topLeftY > bottomRightY:
-                    continue
+        outputArray = np.empty((outputHeight, outputWidth, 3), dtype=np.uint8)
+        outputArray[:] = self._getBackgroundArray()
+        occupied = occupancy[:, :, 0] > 0
+        outputArray[occupied] = occupancy[occupied][:, 1:] // occupancy[occupied][:, :1]
+        return outputArray
 
-                outputImageDraw.rectangle([(topLeftX, topLeftY), (bottomRightX, bottomRightY)], fill = tuple(cell.cellData["color"]))
+    def _renderArea(self, gridLeftBound, gridTopBound, pixelLeft, pixelTop, width, height):
+        areaLeft = math.floor(gridLeftBound + pixelLeft / self._scale)
+        areaTop = math.floor(gridTopBound + pixelTop / self._scale)
+        areaRight = math.floor(gridLeftBound + (pixelLeft + width) / self._scale)
+        areaBottom = math.floor(gridTopBound + (pixelTop + height) / self._scale)
+        xPositions, yPositions, colors = self._gatherCells(self._cellSource.getCellsInArea(areaLeft, areaTop, areaRight, areaBottom))
+        return np.ascontiguousarray(self._rasterize(xPositions, yPositions, colors, self._getBackgroundArray(), gridLeftBound, gridTopBound, width, height, pixelLeft, pixelTop))
+
+    def setOutputEncoding(self, encoding):
+        if encoding not in Simple2DRenderer.OUTPUT_ENCODINGS:
+            raise ValueError("Unknown output encoding: " + str(encoding))
+        self._outputEncoding = encoding
+
+    def getOutputEncoding(self):
+        return self._outputEncoding
+
+    def _encodeImage(self, outputImage):
+        if self._outputEncoding == "image":
+            return outputImage
+        if self._outputEncoding == "array":
+            return np.asarray(outputImage.convert("RGB"))
+        if self._outputEncoding == "raw":
+            return outputImage.convert("RGB").tobytes()
 
-        # Convert PIL image to PNG bytes
         buffer = BytesIO()
-        outputImage.save(buffer, format="PNG")
+        if self._outputEncoding == "bmp":
+            outputImage.save(buffer, format="BMP")
+        elif self._outputEncoding == "png-fast":
+            outputImage.save(buffer, format="PNG", compress_level=1)
+        else:
+            outputImage.save(buffer, format="PNG", compress_level=self._pngCompressLevel)
         return buffer.getvalue()
+
+    def _rasterizePalette(self, xPositions, yPositions, colors, gridLeftBound, gridTopBound, outputWidth, outputHeight):
+        # cell packs only use a handful of colors, so the frame is painted with palette indices directly
+        paletteColors = np.concatenate((self._getBackgroundArray()[np.newaxis], colors))
+        packedColors = (paletteColors[:, 0].astype(np.uint32) << 16) | (paletteColors[:, 1].astype(np.uint32) << 8) | paletteColors[:, 2]
+        uniqueColors, colorIndices = np.unique(packedColors, return_inverse=True)
+        if len(uniqueColors) > 256:
+            return None
+
+        colorIndices = colorIndices.reshape(-1).astype(np.uint8)
+        outputArray = self._rasterize(xPositions, yPositions, colorIndices[1:], colorIndices[0], gridLeftBound, gridTopBound, outputWidth, outputHeight)
+        outputImage = Image.fromarray(outputArray)
+        outputImage.putpalette(np.stack(((uniqueColors >> 16) & 255, (uniqueColors >> 8) & 255, uniqueColors & 255), axis=1).astype(np.uint8).tobytes())
+        return outputImage
+
+    def _gatherCells(self, simple2DCellList):
+        if hasattr(simple2DCellList, "columns"):
+            return simple2DCellList.columns["xPosition"], simple2DCellList.columns["yPosition"], simple2DCellList.columns["color"]
+
+        cellCount = len(simple2DCellList)
+        if cellCount == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 3), dtype=np.uint8)
+
+        xPositions = np.fromiter((cell.cellData["xPosition"] for cell in simple2DCellList), dtype=np.int64, count=cellCount)
+        yPositions = np.fromiter((cell.cellData["yPosition"] for cell in simple2DCellList), dtype=np.int64, count=cellCount)
+        colors = np.array([tuple(cell.cellData["color"]) for cell in simple2DCellList], dtype=np.uint8).reshape(cellCount, 3)
+        return xPositions, yPositions, colors
+
+    def _rasterize(self, xPositions, yPositions, values, backgroundValue, gridLeftBound, gridTopBound, outputWidth, outputHeight, pixelLeft = 0, pixelTop = 0):
+        # renders the outputWidth x outputHeight window at (pixelLeft, pixelTop) of the frame
+        scale = self._scale
+        if scale == 1:
+            outputArray = np.empty((outputHeight, outputWidth) + values.shape[1:], dtype=values.dtype)
+            outputArray[:] = backgroundValue
+
+            pixelX = np.floor(xPositions - gridLeftBound).astype(np.int64) - pixelLeft
+            pixelY = np.floor(yPositions - gridTopBound).astype(np.int64) - pixelTop
+            visible = (pixelX >= 0) & (pixelX < outputWidth) & (pixelY >= 0) & (pixelY < outputHeight)
+            outputArray[pixelY[visible], pixelX[visible]] = values[visible]
+            return outputArray
+
+        # paint one pixel per visible grid cell, then blow every pixel up to a scale x scale block
+        firstColumn = math.floor(gridLeftBound)
+        firstRow = math.floor(gridTopBound)
+        columnBase = math.floor((firstColumn - gridLeftBound) * scale)
+        rowBase = math.floor((firstRow - gridTopBound) * scale)
+        columnStart, columnInset = divmod(pixelLeft - columnBase, scale)
+        rowStart, rowInset = divmod(pixelTop - rowBase, scale)
+        columnCount = (outputWidth + columnInset + scale - 1) // scale
+        rowCount = (outputHeight + rowInset + scale - 1) // scale
+
+        gridArray = np.empty((rowCount, columnCount) + values.shape[1:], dtype=values.dtype)
+        gridArray[:] = backgroundValue
+
+        gridX = xPositions - (firstColumn + columnStart)
+        gridY = yPositions - (firstRow + rowStart)
+        visible = (gridX >= 0) & (gridX < columnCount) & (gridY >= 0) & (gridY < rowCount)
+        # cells cut down to a one pixel sliver at the frame edge are skipped, as the rectangle renderer always did
+        for sliverColumn in self._getSliverPositions(firstColumn, columnBase, self.outputResolutionW):
+            visible &= xPositions != sliverColumn
+        for sliverRow in self._getSliverPositions(firstRow, rowBase, self.outputResolutionH):
+            visible &= yPositions != sliverRow
+        gridArray[gridY[visible], gridX[visible]] = values[visible]
+
+        expandedArray = np.repeat(np.repeat(gridArray, scale, axis=0), scale, axis=1)
+        return expandedArray[rowInset:rowInset + outputHeight, columnInset:columnInset + outputWidth]
+
+    def _getSliverPositions(self, firstPosition, pixelBase, frameSize):
+        # grid positions whose block covers a single pixel of the frame, firstPosition's block starts at pixelBase <= 0
+        sliverPositions = []
+        if pixelBase + self._scale == 1:
+            sliverPositions.append(firstPosition)
+        if (frameSize - 1 - pixelBase) % self._scale == 0:
+            sliverPositions.append(firstPosition + (frameSize - 1 - pixelBase) // self._scale)
+        return sliverPositions
     
     def setBackgroundColor(self, colorTuple):
         self._backgroundColor = colorTuple
 
+    def setScale(self, scale):
+        # pixels per cell, below 1 it snaps to the power of two the zoomed out view is built for
+        if scale >= 1:
+            self._scale = int(scale)
+        else:
+            self._scale = 2 ** round(math.log2(max(scale, Simple2DRenderer.MIN_SCALE)))
+
+    def _getBackgroundArray(self):
+        # environments may hand over out of range channels, which PIL used to clamp
+        return np.clip(np.array(self._backgroundColor[:3], dtype=np.int64), 0, 255).astype(np.uint8)
+
+    def setCellSource(self, cellSource):
+        # cellSource provides getCellsInArea(left, top, right, bottom) so only visible cells are gathered,
+        # and takeChangedPositions() so frames can be redrawn incrementally
+        self._cellSource = cellSource
+        self._frameBuffer = None
+
     def convertFromImageCoordinates(self, xCoordinate, yCoordinate):
         xConverted = math.floor((xCoordinate / self._scale) + (self._xCenterPosition - self.outputResolutionW / (2 * self._scale)))
         yConverted = math.floor((yCoordinate / self._scale) + (self._yCenterPosition - self.outputResolutionH / (2 * self._scale)))
@@ -81,15 +353,24 @@ class Simple2DRenderer(Renderer):
 
     def _zoomIn(self):
         self._scale *= 2
+        if self._scale >= 1:
+            self._scale = int(self._scale)
     
     def _zoomOut(self):
-        self._scale //= 2
-        if self._scale < 1:
-            self._scale = 1
+        if self._scale > 1:
+            self._scale //= 2
+        else:
+            self._scale = max(self._scale / 2, Simple2DRenderer.MIN_SCALE)
 
     def _setMoveSpeed(self, speed):
         self._moveSpeed = speed
 
+    def _setOutputEncodingIndex(self, index):
+        self._outputEncoding = Simple2DRenderer.DISPLAY_ENCODINGS[index]
+
+    def _setPngCompressLevel(self, level):
+        self._pngCompressLevel = level
+
     def _primaryDrag(self, originalData, newData):
         self._xCenterPosition += (originalData[0] - newData[0]) / self._scale
         self._yCenterPosition += (originalData[1] - newData[1]) / self._scale
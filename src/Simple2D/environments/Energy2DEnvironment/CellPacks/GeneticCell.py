@@ -1,57 +1,93 @@
 from base_classes.CellBrain import CellBrain
-import random
+from collections import OrderedDict
 
 class GeneticCell(CellBrain):
     COLOR = (0, 255, 127)
+    DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+    PROGRAM_CACHE_SIZE = 4096
+    _programCache = OrderedDict()
 
     def __init__(self, environment, firstGenome = None, secondGenome = None):
         super().__init__(environment)
         genomeSize = 15
         mutationRate = 0.05
-        self.genome = []
+        randomStream = environment.getRandom()
+        # the draws for all genes are taken at once, one batch per kind
+        genome = randomStream.randints(1, 1000, genomeSize)
         if firstGenome != None and secondGenome != None:
-            for i in range(genomeSize):
-                if len(firstGenome) < i + 1 or len(secondGenome) < i + 1 or random.random() < mutationRate:
-                    self.genome.append(random.randint(1, 1000))
-                else:
-                    self.genome.append(max(0, min(1000, (int(firstGenome[i]), int(secondGenome[i]))[random.randint(0, 1)])))                   
-        else:
-            for i in range(genomeSize):
-                self.genome.append(random.randint(1, 1000))
+            mutations = randomStream.randoms(genomeSize)
+            parents = randomStream.randints(0, 1, genomeSize)
+            for i in range(min(genomeSize, len(firstGenome), len(secondGenome))):
+                if mutations[i] >= mutationRate:
+                    genome[i] = max(0, min(1000, (int(firstGenome[i]), int(secondGenome[i]))[parents[i]]))
+        # genomes are immutable and interned in the environment's pool, so equal genomes are the same object and can be compared with "is"
+        self._genomePool = environment.getGenomePool()
+        self.genome = self._genomePool.intern(genome)
 
         self.variable = 200
 
         self.colorSet = False
+        self._program = None
+
+    def release(self):
+        # called by the environment when the cell is removed or never got spawned
+        if self._genomePool != None:
+            self._genomePool.release(self.genome)
+            self._genomePool = None
+
+    @classmethod
+    def _compileGenome(cls, genome):
+        # offspring are mostly clones, so decoded programs are shared by genome content and evicted least recently used first
+        program = cls._programCache.get(genome)
+        if program != None:
+            cls._programCache.move_to_end(genome)
+            return program
+
+        newColor = [0, 0, 0]
+        third = len(genome) // 3
+        for i in range(third):
+            newColor[0] += genome[i]
+            newColor[1] += genome[third + i]
+            newColor[2] += genome[2 * third + i]
+        color = ((int)(newColor[0] / (1000 * third) * 255), (int)(newColor[1] / (1000 * third) * 255), (int)(newColor[2] / (1000 * third) * 255))
+
+        instructions = []
+        for i in range(len(genome)):
+            nextNumber = genome[(i + 1) % len(genome)]
+            direction = cls.DIRECTIONS[nextNumber % 4]
+            instructions.append((genome[i] % 14, nextNumber, direction[0], direction[1]))
+
+        program = (color, tuple(instructions))
+        cls._programCache[genome] = program
+        if len(cls._programCache) > cls.PROGRAM_CACHE_SIZE:
+            cls._programCache.popitem(last=False)
+        return program
+
 
     def run(self):
-        if not self.colorSet:
-            newColor = [0, 0, 0]
-            third = len(self.genome) // 3
-            for i in range(third):
-                newColor[0] += self.genome[i]
-                newColor[1] += self.genome[third + i]
-                newColor[2] += self.genome[2 * third + i]
+        if self._program == None:
+            self._program = GeneticCell._compileGenome(self.genome)
+        color, instructions = self._program
+        environment = self._environment
 
-            self._environment.changeColor(((int)(newColor[0] / (1000 * third) * 255), (int)(newColor[1] / (1000 * third) * 255), (int)(newColor[2] / (1000 * third) * 255)))
+        if not self.colorSet:
+            environment.changeColor(color)
             self.colorSet = True
         i = 0
-        while i < len(self.genome):
-            currentInstruction = self.genome[i] % 14
-            nextNumber = self.genome[(i + 1) % len(self.genome)]
-            direction = [[0, 1], [1, 0], [0, -1], [-1, 0]][nextNumber % 4]
-            currentEnergy = self._environment.getEnergyLevel()
+        while i < len(instructions):
+            currentInstruction, nextNumber, xDirection, yDirection = instructions[i]
 
             if currentInstruction == 1:
-                self._environment.rest()
+                environment.rest()
             elif currentInstruction == 2:
                 if self.variable > 100:
-                    messageMemory = self._environment.getTopMessage()
+                    messageMemory = environment.getTopMessage()
                     if messageMemory != None:
                         secondGenome = messageMemory
                     else:
                         secondGenome = self.genome
-                    newCellBrain = GeneticCell(self._environment, self.genome, secondGenome)
-                    self._environment.spawnCell(direction[0], direction[1], newCellBrain)
+                    newCellBrain = GeneticCell(environment, self.genome, secondGenome)
+                    environment.spawnCell(xDirection, yDirection, newCellBrain)
                     i += 1
                         
             elif currentInstruction == 3:
@@ -59,26 +95,26 @@ class GeneticCell(CellBrain):
             elif currentInstruction == 4:
                 self.variable -= nextNumber
             elif currentInstruction == 5:
-                self.variable += currentEnergy * 10
+                self.variable += environment.getEnergyLevel() * 10
             elif currentInstruction == 6:
-                self.variable -= currentEnergy * 10
+                self.variable -= environment.getEnergyLevel() * 10
             elif currentInstruction == 7:
                 self.variable = 0
             elif currentInstruction == 8:
-                self._environment.move(direction[0], direction[1])
+                environment.move(xDirection, yDirection)
                 i += 1
             elif currentInstruction == 9:
-                self._environment.deleteCurrentCell()
+                environment.deleteCurrentCell()
             elif currentInstruction == 10:
-                if self._environment.checkForCell(direction[0], direction[1]):
+                if environment.checkForCell(xDirection, yDirection):
                     self.variable += 100
                 i += 1
             elif currentInstruction == 11:
                 if self.variable > 100:
-                    self._environment.sendMessage(direction[0], direction[1], self.genome)
+                    environment.sendMessage(xDirection, yDirection, self.genome)
                     i += 1
             elif currentInstruction == 12:
                 if self.variable > 0:
-                    self._environment.giveEnergy(direction[0], direction[1], 1 / max(1, self.variable))
+                    environment.giveEnergy(xDirection, yDirection, 1 / max(1, self.variable))
                     i += 1
             i += 1
\ No newline at end of file
@@ -2,33 +2,265 @@ from base_classes.Environment import Environment
 from base_classes.Cell import Cell
 import math
 from ExportFunctions import ExportFunction, ControlElement
+import numpy as np
+import csv
+import json
+import os
+import sys
+
+# shared helpers, see Simple2DEnvironment for why the path is added by hand
+sharedPath = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "Shared")
+if sharedPath not in sys.path:
+    sys.path.append(sharedPath)
+from CellSnapshot import SnapshotPublisher
+from RandomStream import RandomStream
+
+class MessageInbox:
+    # fixed-capacity ring buffer of received messages, the slots are only allocated once the first message arrives
+    __slots__ = ("_buffer", "_head", "_count")
+
+    def __init__(self, messages = ()):
+        self._buffer = None
+        self._head = 0
+        self._count = 0
+        for message in messages:
+            self.push(message, max(1, len(messages)), True)
+
+    def __len__(self):
+        return self._count
+
+    def push(self, message, capacity, dropOldest):
+        # returns True when a message was lost, either the oldest one or the new one depending on dropOldest
+        if self._buffer == None or len(self._buffer) != capacity:
+            self._resize(capacity)
+
+        if self._count == capacity:
+            if not dropOldest:
+                return True
+            self._buffer[self._head] = message
+            self._head = (self._head + 1) % capacity
+            return True
+
+        self._buffer[(self._head + self._count) % capacity] = message
+        self._count += 1
+        return False
+
+    def pop(self):
+        if self._count == 0:
+            return None
+        message = self._buffer[self._head]
+        self._buffer[self._head] = None
+        self._head = (self._head + 1) % len(self._buffer)
+        self._count -= 1
+        return message
+
+    def _resize(self, capacity):
+        # a shrinking inbox keeps its newest messages
+        messages = []
+        while self._count > 0:
+            messages.append(self.pop())
+        messages = messages[max(0, len(messages) - capacity):]
+        self._buffer = messages + [None] * (capacity - len(messages))
+        self._head = 0
+        self._count = len(messages)
+
+class GenomePool:
+    # interning of genome tuples for one environment, identical genomes share one object for as long as a cell holds them
+    def __init__(self):
+        self._genomes = {}
+
+    def intern(self, genome):
+        genome = tuple(genome)
+        entry = self._genomes.get(genome)
+        if entry == None:
+            entry = [genome, 0]
+            self._genomes[genome] = entry
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, genome):
+        entry = self._genomes.get(genome)
+        if entry == None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._genomes[genome]
+
+    def getReferenceCount(self, genome):
+        entry = self._genomes.get(genome)
+        return 0 if entry == None else entry[1]
+
+    def getDiversity(self):
+        # number of distinct genomes currently alive
+        return len(self._genomes)
+
+    def __len__(self):
+        return len(self._genomes)
+
+class PopulationStatistics:
+    # one row per step in a fixed-size ring buffer, events in between only bump integer counters
+    FIELDS = ("step", "population", "births", "deathsStarved", "deathsOvercharged", "deathsLeftArena", "deathsSelf", "moves", "energyTransfers", "energyTransferred", "messagesSent", "messagesDelivered", "messagesDropped", "meanEnergy", "genomeDiversity")
+    FLOAT_FIELDS = ("energyTransferred", "meanEnergy")
+
+    def __init__(self, capacity = 4096, histogramBins = 10):
+        self._rows = np.zeros((capacity, len(PopulationStatistics.FIELDS)))
+        self._histograms = np.zeros((capacity, histogramBins), dtype=np.int64)
+        self._nextRow = 0
+        self._rowCount = 0
+        self._resetCounters()
+
+    def _resetCounters(self):
+        self.births = 0
+        self.deathsStarved = 0
+        self.deathsOvercharged = 0
+        self.deathsLeftArena = 0
+        self.deathsSelf = 0
+        self.moves = 0
+        self.energyTransfers = 0
+        self.energyTransferred = 0.0
+
+    def __len__(self):
+        return self._rowCount
+
+    def record(self, step, energy, genomeDiversity, messageCounters):
+        # genomeDiversity is the number of distinct genomes alive, as counted by the environment's GenomePool
+        histogramBins = self._histograms.shape[1]
+        self._rows[self._nextRow] = (step, len(energy), self.births, self.deathsStarved, self.deathsOvercharged, self.deathsLeftArena, self.deathsSelf, self.moves, self.energyTransfers, self.energyTransferred,
+                                     messageCounters["sent"], messageCounters["delivered"], messageCounters["dropped"], energy.mean() if len(energy) > 0 else 0.0, genomeDiversity)
+        self._histograms[self._nextRow] = np.bincount(np.clip((energy * histogramBins).astype(np.int64), 0, histogramBins - 1), minlength=histogramBins)
+
+        self._nextRow = (self._nextRow + 1) % len(self._rows)
+        self._rowCount = min(self._rowCount + 1, len(self._rows))
+        self._resetCounters()
+
+    def getRows(self):
+        # oldest first, energyHistogram counts cells per equal-width energy bin between 0 and 1
+        rows = []
+        for offset in range(self._rowCount):
+            index = (self._nextRow - self._rowCount + offset) % len(self._rows)
+            row = {}
+            for name, value in zip(PopulationStatistics.FIELDS, self._rows[index].tolist()):
+                row[name] = value if name in PopulationStatistics.FLOAT_FIELDS else int(value)
+            row["energyHistogram"] = self._histograms[index].tolist()
+            rows.append(row)
+        return rows
+
+    def writeCsv(self, path):
+        histogramColumns = ["energyBin" + str(index) for index in range(self._histograms.shape[1])]
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(list(PopulationStatistics.FIELDS) + histogramColumns)
+            for row in self.getRows():
+                writer.writerow([row[name] for name in PopulationStatistics.FIELDS] + row["energyHistogram"])
+
+    def writeJson(self, path):
+        with open(path, "w") as file:
+            json.dump(self.getRows(), file, indent=4)
 
 class Energy2DEnvironment(Environment):
+    MOORE_NEIGHBORHOOD = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+    VON_NEUMANN_NEIGHBORHOOD = ((-1, 0), (0, -1), (0, 1), (1, 0))
+    BUCKET_SHIFT = 4
+    CHANGE_LOG_LIMIT = 4096
+    MESSAGE_DROP_POLICIES = ("drop-newest", "drop-oldest")
+
     def __init__(self, renderer):
         super().__init__(renderer)
+        if hasattr(self._renderer, "setCellSource"):
+            self._renderer.setCellSource(self)
         self._stepCount = 0
         self._cellMap = {}
+        self._cellBuckets = {}
+        self._changedPositions = set()
+        self._changeLogOverflowed = False
+        self._worldVersion = 0
+        self._random = RandomStream()
+        self._genomePool = GenomePool()
+        self._snapshots = SnapshotPublisher(self._fillSnapshot)
         self._topEnergy = 0.1
         self._bottomEnergy = 0.1
         self._arenaSize = 25
+        self._energyLevel = self._computeEnvironmentEnergyLevel()
+        self._inboxCapacity = 16
+        self._messageDropPolicy = "drop-newest"
+        self._messageCounters = {"sent": 0, "delivered": 0, "dropped": 0}
+        self._lastMessageCounters = dict(self._messageCounters)
+        self._statistics = None
+        self._stoppedStatistics = None
 
         self._exportFunctions = [
             ExportFunction(self._setTopEnergy, "Peak positive energy", ControlElement.SLIDER, [0, 50, 10]),
             ExportFunction(self._setBottomEnergy, "Peak negative energy", ControlElement.SLIDER, [0, 50, 10]),
-            ExportFunction(self._setArenaSize, "Arena size", ControlElement.SLIDER, [10, 100, 25])
+            ExportFunction(self._setArenaSize, "Arena size", ControlElement.SLIDER, [10, 100, 25]),
+            ExportFunction(self._setInboxCapacity, "Message inbox size", ControlElement.SLIDER, [1, 64, 16]),
+            ExportFunction(self._setMessageDropPolicyIndex, "Full inbox drops oldest", ControlElement.SLIDER, [0, len(Energy2DEnvironment.MESSAGE_DROP_POLICIES) - 1, 0]),
+            ExportFunction(self._toggleStatistics, "Toggle population statistics", ControlElement.BUTTON),
+            ExportFunction(self._exportStatistics, "Export population statistics", ControlElement.BUTTON)
         ]
         
     def _setTopEnergy(self, value):
         self._topEnergy = value / 100
+        self._energyLevel = self._computeEnvironmentEnergyLevel()
 
     def _setBottomEnergy(self, value):
         self._bottomEnergy = value / 100
+        self._energyLevel = self._computeEnvironmentEnergyLevel()
 
     def _setArenaSize(self, value):
         self._arenaSize = value
 
 
+    def _setInboxCapacity(self, value):
+        self._inboxCapacity = max(1, int(value))
+
+    def _setMessageDropPolicyIndex(self, index):
+        self.setMessageDropPolicy(Energy2DEnvironment.MESSAGE_DROP_POLICIES[int(index)])
+
+    def setMessageDropPolicy(self, policy):
+        if policy not in Energy2DEnvironment.MESSAGE_DROP_POLICIES:
+            raise ValueError("Unknown message drop policy: " + str(policy))
+        self._messageDropPolicy = policy
+
+    def _toggleStatistics(self):
+        if self._statistics == None:
+            self.enableStatistics()
+        else:
+            self.disableStatistics()
+
+    def enableStatistics(self, capacity = 4096):
+        self._statistics = PopulationStatistics(capacity)
+        self._stoppedStatistics = None
+
+    def disableStatistics(self):
+        # the rows recorded so far stay available for getStatistics and export
+        self._stoppedStatistics = self._statistics
+        self._statistics = None
+
+    def getStatistics(self):
+        return self._statistics if self._statistics != None else self._stoppedStatistics
+
+    def exportStatistics(self, path):
+        statistics = self.getStatistics()
+        if statistics == None:
+            return
+        if path.lower().endswith(".json"):
+            statistics.writeJson(path)
+        else:
+            statistics.writeCsv(path)
+
+    def _exportStatistics(self):
+        # environments have no file dialog, so the button writes into the working directory
+        self.exportStatistics("Energy2DStatistics.csv")
+        self.exportStatistics("Energy2DStatistics.json")
+
+    def getMessageCounters(self):
+        # messages sent, delivered and dropped during the last finished step
+        return dict(self._lastMessageCounters)
+
     def _getEnvironmentEnergyLevel(self):
+        return self._energyLevel
+
+    def _computeEnvironmentEnergyLevel(self):
         cosValue = math.sin(self._stepCount * math.pi / 30)
         if cosValue > 0:
             return self._topEnergy * cosValue
@@ -36,23 +268,163 @@ class Energy2DEnvironment(Environment):
             return self._bottomEnergy * cosValue
         return 0
 
+    def _logChange(self, x, y):
+        self._worldVersion += 1
+        if self._changeLogOverflowed:
+            return
+        self._changedPositions.add((x, y))
+        if len(self._changedPositions) > self.CHANGE_LOG_LIMIT:
+            self._invalidateChangeLog()
+
+    def _invalidateChangeLog(self):
+        self._worldVersion += 1
+        self._changeLogOverflowed = True
+        self._changedPositions = set()
+
+    def getRandom(self):
+        return self._random
+
+    def getGenomePool(self):
+        return self._genomePool
+
+    def setRandomSeed(self, seed):
+        # an int or a numpy SeedSequence, e.g. one spawned per worker so parallel runs stay reproducible
+        self._random.seed(seed)
+
+    def getSnapshot(self):
+        # call between steps, the columns are only copied when the world changed since the last snapshot
+        return self._snapshots.get()
+
+    def _fillSnapshot(self, snapshot):
+        cells = list(self._cellMap.values())
+        cellCount = len(cells)
+        columns = {
+            "xPosition": np.fromiter((cell.cellData["xPosition"] for cell in cells), dtype=np.int64, count=cellCount),
+            "yPosition": np.fromiter((cell.cellData["yPosition"] for cell in cells), dtype=np.int64, count=cellCount),
+            "color": np.array([tuple(cell.cellData["color"]) for cell in cells], dtype=np.uint8).reshape(cellCount, 3),
+            "energy": self._collectEnergy(cells)
+        }
+        snapshot._fill(columns, None, cellCount)
+        snapshot.stepNumber = self._stepCount
+        snapshot.worldVersion = self._worldVersion
+
+    def _collectEnergy(self, cells):
+        return np.fromiter((cell.cellData["energy"] for cell in cells), dtype=np.float64, count=len(cells))
+
+    def getWorldVersion(self):
+        # bumped on every spawn, delete, move or color change so renderers can reuse unchanged frames
+        return self._worldVersion
+
+    def takeChangedPositions(self):
+        # None means the log overflowed or the world was replaced, so everything has to be redrawn
+        changedPositions = None if self._changeLogOverflowed else self._changedPositions
+        self._changedPositions = set()
+        self._changeLogOverflowed = False
+        return changedPositions
+
     def _updateCellMap(self, x, y, cell = None):
+        self._logChange(x, y)
+        bucketKey = (int(x) >> self.BUCKET_SHIFT, int(y) >> self.BUCKET_SHIFT)
         if cell == None:
-            self._cellMap.pop((x, y), None)
+            if self._cellMap.pop((x, y), None) != None:
+                bucket = self._cellBuckets[bucketKey]
+                del bucket[(x, y)]
+                if len(bucket) == 0:
+                    del self._cellBuckets[bucketKey]
         else:
             self._cellMap[(x, y)] = cell
+            bucket = self._cellBuckets.get(bucketKey)
+            if bucket == None:
+                bucket = {}
+                self._cellBuckets[bucketKey] = bucket
+            bucket[(x, y)] = cell
+
+    def getCellsInArea(self, left, top, right, bottom):
+        if right < left or bottom < top:
+            return []
+
+        firstBucketX = int(left) >> self.BUCKET_SHIFT
+        firstBucketY = int(top) >> self.BUCKET_SHIFT
+        lastBucketX = int(right) >> self.BUCKET_SHIFT
+        lastBucketY = int(bottom) >> self.BUCKET_SHIFT
+
+        if (lastBucketX - firstBucketX + 1) * (lastBucketY - firstBucketY + 1) <= len(self._cellBuckets):
+            buckets = []
+            for bucketY in range(firstBucketY, lastBucketY + 1):
+                for bucketX in range(firstBucketX, lastBucketX + 1):
+                    bucket = self._cellBuckets.get((bucketX, bucketY))
+                    if bucket != None:
+                        buckets.append(((bucketX, bucketY), bucket))
+        else:
+            buckets = self._cellBuckets.items()
+
+        cells = []
+        for (bucketX, bucketY), bucket in buckets:
+            bucketLeft = bucketX << self.BUCKET_SHIFT
+            bucketTop = bucketY << self.BUCKET_SHIFT
+            bucketSize = 1 << self.BUCKET_SHIFT
+            if bucketLeft >= left and bucketTop >= top and bucketLeft + bucketSize - 1 <= right and bucketTop + bucketSize - 1 <= bottom:
+                cells.extend(bucket.values())
+                continue
+
+            for (x, y), cell in bucket.items():
+                if left <= x <= right and top <= y <= bottom:
+                    cells.append(cell)
+        return cells
+
+    def _rebuildCellMap(self):
+        # cells taken out of the executor by hand are gone for good
+        keptCells = set(self._cellExecutor.cellList)
+        for cell in self._cellMap.values():
+            if cell not in keptCells:
+                self._releaseBrain(cell.cellBrain)
+
+        self._cellMap = {}
+        self._cellBuckets = {}
+
+        for cell in self._cellExecutor.cellList:
+            if not isinstance(cell.cellData.get("messages"), MessageInbox):
+                cell.cellData["messages"] = MessageInbox(cell.cellData.get("messages") or ())
+            self._updateCellMap(cell.cellData["xPosition"], cell.cellData["yPosition"], cell)
+        self._invalidateChangeLog()
+
+    def _releaseBrain(self, cellBrain):
+        # brains holding shared resources, like GeneticCell's interned genome, hand them back in release()
+        release = getattr(cellBrain, "release", None)
+        if release != None:
+            release()
         
     def _cellsCycled(self):
         self._stepCount += 1
+        self._energyLevel = self._computeEnvironmentEnergyLevel()
         colorLevel = int((self._getEnvironmentEnergyLevel()) * 255 * 2)
         self._renderer.setBackgroundColor((colorLevel, colorLevel, -colorLevel))
 
+        self._lastMessageCounters = self._messageCounters
+        self._messageCounters = {"sent": 0, "delivered": 0, "dropped": 0}
+
+        if self._statistics != None:
+            self._statistics.record(self._stepCount, self._collectEnergy(self._cellMap.values()), self._genomePool.getDiversity(), self._lastMessageCounters)
+
+        self._snapshots.invalidate()
+
     def _cellSwitched(self):
-        currentCell = self._cellExecutor.currentCell
-        currentCell.cellData["energy"] += self._getEnvironmentEnergyLevel()
-        if 0 >= currentCell.cellData["energy"] or 1 < currentCell.cellData["energy"] or currentCell.cellData["xPosition"] < -self._arenaSize or currentCell.cellData["xPosition"] > self._arenaSize or currentCell.cellData["yPosition"] < -self._arenaSize or currentCell.cellData["yPosition"] > self._arenaSize:
-            self.deleteCurrentCell()
         self._cellActed = False
+        currentCell = self._cellExecutor.currentCell
+        cellData = currentCell.cellData
+        cellData["energy"] += self._energyLevel
+        energy = cellData["energy"]
+        starved = 0 >= energy
+        overcharged = 1 < energy
+        if starved or overcharged or cellData["xPosition"] < -self._arenaSize or cellData["xPosition"] > self._arenaSize or cellData["yPosition"] < -self._arenaSize or cellData["yPosition"] > self._arenaSize:
+            if self._statistics != None:
+                if starved:
+                    self._statistics.deathsStarved += 1
+                elif overcharged:
+                    self._statistics.deathsOvercharged += 1
+                else:
+                    self._statistics.deathsLeftArena += 1
+            self._removeCurrentCell()
 
 
     def _primaryClick(self, data):
@@ -62,7 +434,18 @@ class Energy2DEnvironment(Environment):
         self.addUserCell(newData)
 
     def _executorClearedCells(self):
+        for cell in self._cellMap.values():
+            self._releaseBrain(cell.cellBrain)
         self._cellMap = {}
+        self._cellBuckets = {}
+        self._invalidateChangeLog()
+
+        self._snapshots.invalidate()
+
+    def _cellsChangedManually(self):
+        self._rebuildCellMap()
+
+        self._snapshots.invalidate()
 
     def addUserCell(self, data):
         xCoordinate = data[0]
@@ -88,7 +471,9 @@ class Energy2DEnvironment(Environment):
         yCoordinate = data[1]
 
         if (xCoordinate, yCoordinate) in self._cellMap:
-            self._cellExecutor.removeCell(self._cellMap[(xCoordinate, yCoordinate)])
+            cell = self._cellMap[(xCoordinate, yCoordinate)]
+            self._cellExecutor.removeCell(cell)
+            self._releaseBrain(cell.cellBrain)
             
         self._updateCellMap(xCoordinate, yCoordinate)
     
@@ -138,8 +523,42 @@ class Energy2DEnvironment(Environment):
 
         return False
 
+    def _matchNeighborhood(self, offsets, cellType):
+        cellCheckBaseCost = 0.025
+
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return [True] * len(offsets)
+
+        cellData = currentCell.cellData
+        currentCellX = cellData["xPosition"]
+        currentCellY = cellData["yPosition"]
+
+        matches = []
+        for relativeXCoordinate, relativeYcoordinate in offsets:
+            cellCheckCost = cellCheckBaseCost * (relativeXCoordinate // 1 + relativeYcoordinate // 1)
+            if cellData["energy"] < cellCheckCost:
+                matches.append(True)
+                continue
+            cellData["energy"] -= cellCheckCost
+
+            checkedCell = self._cellMap.get((currentCellX + relativeXCoordinate // 1, currentCellY + relativeYcoordinate // 1))
+            matches.append(checkedCell != None and isinstance(checkedCell.cellBrain, cellType))
+        return matches
+
+    def countCellTypes(self, offsets, cellType):
+        return sum(self._matchNeighborhood(offsets, cellType))
+
+    def getCellTypeMask(self, offsets, cellType):
+        mask = 0
+        for index, matched in enumerate(self._matchNeighborhood(offsets, cellType)):
+            if matched:
+                mask |= 1 << index
+        return mask
+
     def _spawnCell(self, xCoordinate, yCoordinate, newCellBrain):
         if self._checkForCellAbsolute(xCoordinate, yCoordinate):
+            self._releaseBrain(newCellBrain)
             return
 
         newCell = Cell(newCellBrain)
@@ -150,7 +569,7 @@ class Energy2DEnvironment(Environment):
         else:
             newCell.cellData["color"] = (255, 255, 255)
         newCell.cellData["energy"] = 0.5
-        newCell.cellData["messages"] = []
+        newCell.cellData["messages"] = MessageInbox()
         
         self._cellExecutor.addCell(newCell)
 
@@ -159,6 +578,7 @@ class Energy2DEnvironment(Environment):
     def spawnCell(self, xDirection, yDirection, newCellBrain):
         spawnCost = 0.5
         if self._cellActed or self.getEnergyLevel() < spawnCost:
+            self._releaseBrain(newCellBrain)
             return
 
         currentCell = self._cellExecutor.currentCell
@@ -169,10 +589,13 @@ class Energy2DEnvironment(Environment):
         newYPosition = oldYPosition + yDirection
         
         if self._checkForCellAbsolute(newXPosition, newYPosition):
+            self._releaseBrain(newCellBrain)
             return
 
         self._cellActed = True
         self._spawnCell(newXPosition, newYPosition, newCellBrain)
+        if self._statistics != None:
+            self._statistics.births += 1
 
 
     def deleteCurrentCell(self):
@@ -180,11 +603,22 @@ class Energy2DEnvironment(Environment):
         if currentCell == None:
             return
         
+        # a brain can delete itself more than once in a turn, only the first time is a death
+        if self._removeCurrentCell() and self._statistics != None:
+            self._statistics.deathsSelf += 1
+
+    def _removeCurrentCell(self):
+        currentCell = self._cellExecutor.currentCell
         currentCellX = currentCell.cellData["xPosition"]
         currentCellY = currentCell.cellData["yPosition"]
+        wasAlive = self._cellMap.get((currentCellX, currentCellY)) is currentCell
 
         self._updateCellMap(currentCellX, currentCellY)
         self._cellExecutor.removeCell(currentCell)
+        self._releaseBrain(currentCell.cellBrain)
+        # a deleted cell must not act again, otherwise a later move puts it back into the cell map
+        self._cellActed = True
+        return wasAlive
         
     def getCurrentStepNumber(self):
         return self._stepCount
@@ -231,6 +665,8 @@ class Energy2DEnvironment(Environment):
             currentCell.cellData["energy"] -= movementCost
 
             self._cellActed = True
+            if self._statistics != None:
+                self._statistics.moves += 1
 
     def giveEnergy(self, xDirection, yDirection, energyValue):
         if self._cellActed:
@@ -253,6 +689,9 @@ class Energy2DEnvironment(Environment):
         self._cellMap[(newXPosition, newYPosition)].cellData["energy"] += trueEnergyValue
 
         self._cellActed = True
+        if self._statistics != None:
+            self._statistics.energyTransfers += 1
+            self._statistics.energyTransferred += trueEnergyValue
 
     def sendMessage(self, xDirection, yDirection, message):
         messageCost = 0.05
@@ -272,10 +711,27 @@ class Energy2DEnvironment(Environment):
             return
         
         currentCell.cellData["energy"] -= messageCost
-        self._cellMap[(newXPosition, newYPosition)].cellData["messages"].append(message)
+        self._deliverMessage(self._cellMap[(newXPosition, newYPosition)], message)
 
         self._cellActed = True
 
+    def _deliverMessage(self, cell, message):
+        # receivers get a frozen copy, so a sent list can not be changed through the sender's reference afterwards
+        if isinstance(message, list):
+            message = tuple(message)
+        elif isinstance(message, set):
+            message = frozenset(message)
+        elif isinstance(message, bytearray):
+            message = bytes(message)
+
+        dropOldest = self._messageDropPolicy == "drop-oldest"
+        self._messageCounters["sent"] += 1
+        if cell.cellData["messages"].push(message, self._inboxCapacity, dropOldest):
+            self._messageCounters["dropped"] += 1
+            if not dropOldest:
+                return
+        self._messageCounters["delivered"] += 1
+
     def getMessageCount(self):
         currentCell = self._cellExecutor.currentCell
         if currentCell == None:
@@ -284,10 +740,9 @@ class Energy2DEnvironment(Environment):
     
     def getTopMessage(self):
         currentCell = self._cellExecutor.currentCell
-        if currentCell == None or len(currentCell.cellData["messages"]) < 1:
+        if currentCell == None:
             return None
-        message = currentCell.cellData["messages"][0]
-        return currentCell.cellData["messages"].pop(0)
+        return currentCell.cellData["messages"].pop()
     
     def rest(self):
         if self._cellActed:
@@ -303,4 +758,5 @@ class Energy2DEnvironment(Environment):
         if currentCell == None:
             return
         currentCell.cellData["color"] = colorTuple
+        self._logChange(currentCell.cellData["xPosition"], currentCell.cellData["yPosition"])
         
\ No newline at end of file
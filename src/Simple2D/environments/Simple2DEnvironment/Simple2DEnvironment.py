@@ -1,27 +1,895 @@
 from base_classes.Environment import Environment
 from base_classes.Cell import Cell
 from ExportFunctions import ExportFunction, ControlElement
+import numpy as np
+from collections import OrderedDict
+import os
+import sys
+
+# helpers shared by several environments live in src/Shared, modules are loaded by file path so it is put on sys.path here
+sharedPath = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "Shared")
+if sharedPath not in sys.path:
+    sys.path.append(sharedPath)
+from CellSnapshot import SnapshotPublisher
+from RandomStream import RandomStream
+
+class WireGraph:
+    __slots__ = ("cells", "indptr", "indices", "states", "heads", "tails")
+
+    def __init__(self, cells, indptr, indices, states):
+        self.cells = cells
+        self.indptr = indptr
+        self.indices = indices
+        self.states = states
+        self.heads = np.nonzero(states == 1)[0]
+        self.tails = np.nonzero(states == 2)[0]
+
+class LifeNode:
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population")
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+
+class HashLife:
+    def __init__(self, maxResults = 1 << 19, maxNodes = 1 << 20):
+        self._maxResults = maxResults
+        self._maxNodes = maxNodes
+        self._nodes = {}
+        self._results = OrderedDict()
+
+        self._off = LifeNode(0, None, None, None, None, 0)
+        self._on = LifeNode(0, None, None, None, None, 1)
+        self._emptyNodes = [self._off]
+
+        self._root = self._empty(3)
+        self._originX = 0
+        self._originY = 0
+
+    def _join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = LifeNode(nw.level + 1, nw, ne, sw, se, nw.population + ne.population + sw.population + se.population)
+            self._nodes[key] = node
+        return node
+
+    def _empty(self, level):
+        while len(self._emptyNodes) <= level:
+            empty = self._emptyNodes[-1]
+            self._emptyNodes.append(self._join(empty, empty, empty, empty))
+        return self._emptyNodes[level]
+
+    def _centre(self, node):
+        empty = self._empty(node.level - 1)
+        return self._join(self._join(empty, empty, empty, node.nw),
+                          self._join(empty, empty, node.ne, empty),
+                          self._join(empty, node.sw, empty, empty),
+                          self._join(node.se, empty, empty, empty))
+
+    def _lifeFour(self, node):
+        rows = ((node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne),
+                (node.nw.sw, node.nw.se, node.ne.sw, node.ne.se),
+                (node.sw.nw, node.sw.ne, node.se.nw, node.se.ne),
+                (node.sw.sw, node.sw.se, node.se.sw, node.se.se))
+        cells = [[leaf.population for leaf in row] for row in rows]
+
+        newCells = []
+        for y in (1, 2):
+            for x in (1, 2):
+                neighborCount = sum(cells[y + yOffset][x + xOffset] for yOffset in (-1, 0, 1) for xOffset in (-1, 0, 1)) - cells[y][x]
+                if neighborCount == 3 or (cells[y][x] and neighborCount == 2):
+                    newCells.append(self._on)
+                else:
+                    newCells.append(self._off)
+        return self._join(*newCells)
+
+    # returns the centre of node (one level down) advanced by 2^exponent generations
+    def _successor(self, node, exponent):
+        if node.population == 0:
+            return node.nw
+
+        exponent = min(exponent, node.level - 2)
+        key = (node, exponent)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+
+        if node.level == 2:
+            result = self._lifeFour(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            c1 = self._successor(nw, exponent)
+            c2 = self._successor(self._join(nw.ne, ne.nw, nw.se, ne.sw), exponent)
+            c3 = self._successor(ne, exponent)
+            c4 = self._successor(self._join(nw.sw, nw.se, sw.nw, sw.ne), exponent)
+            c5 = self._successor(self._join(nw.se, ne.sw, sw.ne, se.nw), exponent)
+            c6 = self._successor(self._join(ne.sw, ne.se, se.nw, se.ne), exponent)
+            c7 = self._successor(sw, exponent)
+            c8 = self._successor(self._join(sw.ne, se.nw, sw.se, se.sw), exponent)
+            c9 = self._successor(se, exponent)
+
+            if exponent < node.level - 2:
+                result = self._join(self._join(c1.se, c2.sw, c4.ne, c5.nw),
+                                    self._join(c2.se, c3.sw, c5.ne, c6.nw),
+                                    self._join(c4.se, c5.sw, c7.ne, c8.nw),
+                                    self._join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = self._join(self._successor(self._join(c1, c2, c4, c5), exponent),
+                                    self._successor(self._join(c2, c3, c5, c6), exponent),
+                                    self._successor(self._join(c4, c5, c7, c8), exponent),
+                                    self._successor(self._join(c5, c6, c8, c9), exponent))
+
+        self._results[key] = result
+        if len(self._results) > self._maxResults:
+            self._results.popitem(last = False)
+        return result
+
+    def _build(self, points, level, x, y):
+        if len(points) == 0:
+            return self._empty(level)
+        if level == 0:
+            return self._on
+
+        half = 1 << (level - 1)
+        quadrants = ([], [], [], [])
+        for point in points:
+            quadrants[(point[0] >= x + half) + 2 * (point[1] >= y + half)].append(point)
+
+        return self._join(self._build(quadrants[0], level - 1, x, y),
+                          self._build(quadrants[1], level - 1, x + half, y),
+                          self._build(quadrants[2], level - 1, x, y + half),
+                          self._build(quadrants[3], level - 1, x + half, y + half))
+
+    def setCells(self, positions):
+        points = [(int(x), int(y)) for x, y in positions]
+        if len(points) == 0:
+            self._root = self._empty(3)
+            self._originX = 0
+            self._originY = 0
+            return
+
+        self._originX = min(point[0] for point in points)
+        self._originY = min(point[1] for point in points)
+        size = max(max(point[0] for point in points) - self._originX, max(point[1] for point in points) - self._originY) + 1
+        level = 3
+        while (1 << level) < size:
+            level += 1
+
+        self._root = self._build(points, level, self._originX, self._originY)
+
+    def _isPadded(self):
+        root = self._root
+        return root.population == root.nw.se.se.population + root.ne.sw.sw.population + root.sw.ne.ne.population + root.se.nw.nw.population
+
+    def advance(self, exponent):
+        # pad until nothing can escape the returned centre in 2^exponent generations
+        while self._root.level < exponent + 3 or not self._isPadded():
+            self._originX -= 1 << (self._root.level - 1)
+            self._originY -= 1 << (self._root.level - 1)
+            self._root = self._centre(self._root)
+
+        self._originX += 1 << (self._root.level - 2)
+        self._originY += 1 << (self._root.level - 2)
+        self._root = self._successor(self._root, exponent)
+
+        self._shrink()
+        if len(self._nodes) > self._maxNodes:
+            self._collectGarbage()
+
+    def _shrink(self):
+        root = self._root
+        while root.level > 3 and root.population == root.nw.se.population + root.ne.sw.population + root.sw.ne.population + root.se.nw.population:
+            self._originX += 1 << (root.level - 2)
+            self._originY += 1 << (root.level - 2)
+            root = self._join(root.nw.se, root.ne.sw, root.sw.ne, root.se.nw)
+        self._root = root
+
+    def _collectGarbage(self):
+        self._results.clear()
+        self._nodes = {}
+        visited = set()
+
+        def intern(node):
+            if node.level == 0 or id(node) in visited:
+                return
+            visited.add(id(node))
+            for child in (node.nw, node.ne, node.sw, node.se):
+                intern(child)
+            self._nodes[(node.nw, node.ne, node.sw, node.se)] = node
+
+        for empty in self._emptyNodes:
+            intern(empty)
+        intern(self._root)
+
+    def getPopulation(self):
+        return self._root.population
+
+    def getCells(self):
+        cells = []
+        stack = [(self._root, self._originX, self._originY)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                cells.append((x, y))
+                continue
+            half = 1 << (node.level - 1)
+            stack.append((node.nw, x, y))
+            stack.append((node.ne, x + half, y))
+            stack.append((node.sw, x, y + half))
+            stack.append((node.se, x + half, y + half))
+        return cells
+
+class OccupancyPyramid:
+    LEVELS = 10
+    CHUNK_SHIFT = 6
+    CHUNK_SIZE = 1 << CHUNK_SHIFT
+    CHUNK_MASK = CHUNK_SIZE - 1
+    FLUSH_LIMIT = 1 << 16
+    KEY_OFFSET = 1 << 30
+
+    def __init__(self):
+        # level n sums cell count and color over 2^n x 2^n blocks, stored in 64x64 block chunks
+        self._levels = [None] + [{} for _ in range(self.LEVELS)]
+        self._pendingChanges = []
+
+    def addCells(self, xPositions, yPositions, countDeltas, colorDeltas):
+        values = np.concatenate((np.asarray(countDeltas, dtype=np.int64).reshape(-1, 1), np.asarray(colorDeltas, dtype=np.int64).reshape(-1, 3)), axis=1)
+        blockX = np.asarray(xPositions, dtype=np.int64)
+        blockY = np.asarray(yPositions, dtype=np.int64)
+        if len(values) == 0:
+            return
+
+        # each level is summed from the distinct blocks of the level below it
+        for level in range(1, self.LEVELS + 1):
+            blockKeys = (((blockY >> 1) + self.KEY_OFFSET) << 32) | ((blockX >> 1) + self.KEY_OFFSET)
+            blockKeys, blockIndices = np.unique(blockKeys, return_inverse=True)
+            blockIndices = blockIndices.reshape(-1)
+            values = np.stack([np.bincount(blockIndices, weights=values[:, column], minlength=len(blockKeys)) for column in range(4)], axis=1).round().astype(np.int64)
+            blockX = (blockKeys & 0xFFFFFFFF) - self.KEY_OFFSET
+            blockY = (blockKeys >> 32) - self.KEY_OFFSET
+            self._addBlocks(self._levels[level], blockX, blockY, values)
+
+    def _addBlocks(self, chunks, blockX, blockY, values):
+        chunkKeys = ((blockY >> self.CHUNK_SHIFT) << 32) + (blockX >> self.CHUNK_SHIFT)
+        order = np.argsort(chunkKeys, kind="stable")
+        sortedKeys = chunkKeys[order]
+        boundaries = np.concatenate(([0], np.nonzero(sortedKeys[1:] != sortedKeys[:-1])[0] + 1, [len(sortedKeys)]))
+
+        for index in range(len(boundaries) - 1):
+            selected = order[boundaries[index]:boundaries[index + 1]]
+            firstBlock = selected[0]
+            chunkKey = (int(blockX[firstBlock]) >> self.CHUNK_SHIFT, int(blockY[firstBlock]) >> self.CHUNK_SHIFT)
+            chunk = chunks.get(chunkKey)
+            if chunk is None:
+                chunk = np.zeros((self.CHUNK_SIZE, self.CHUNK_SIZE, 4), dtype=np.int64)
+                chunks[chunkKey] = chunk
+            # blocks are distinct at this point, so a plain fancy-indexed add is enough
+            chunk[blockY[selected] & self.CHUNK_MASK, blockX[selected] & self.CHUNK_MASK] += values[selected]
+
+    def recordChange(self, x, y, countDelta, colorDelta):
+        self._pendingChanges.append((x, y, countDelta, colorDelta[0], colorDelta[1], colorDelta[2]))
+        if len(self._pendingChanges) >= self.FLUSH_LIMIT:
+            self.flush()
+
+    def flush(self):
+        if len(self._pendingChanges) == 0:
+            return
+        changes = np.array(self._pendingChanges, dtype=np.int64)
+        self._pendingChanges = []
+        self.addCells(changes[:, 0], changes[:, 1], changes[:, 2], changes[:, 3:6])
+
+    def getArea(self, level, blockLeft, blockTop, width, height):
+        self.flush()
+        area = np.zeros((height, width, 4), dtype=np.int64)
+        chunks = self._levels[level]
+
+        firstChunkX = blockLeft >> self.CHUNK_SHIFT
+        firstChunkY = blockTop >> self.CHUNK_SHIFT
+        lastChunkX = (blockLeft + width - 1) >> self.CHUNK_SHIFT
+        lastChunkY = (blockTop + height - 1) >> self.CHUNK_SHIFT
+        if (lastChunkX - firstChunkX + 1) * (lastChunkY - firstChunkY + 1) <= len(chunks):
+            chunkKeys = [(chunkX, chunkY) for chunkY in range(firstChunkY, lastChunkY + 1) for chunkX in range(firstChunkX, lastChunkX + 1) if (chunkX, chunkY) in chunks]
+        else:
+            chunkKeys = [(chunkX, chunkY) for chunkX, chunkY in chunks.keys() if firstChunkX <= chunkX <= lastChunkX and firstChunkY <= chunkY <= lastChunkY]
+
+        for chunkX, chunkY in chunkKeys:
+            chunkLeft = chunkX << self.CHUNK_SHIFT
+            chunkTop = chunkY << self.CHUNK_SHIFT
+            left = max(blockLeft, chunkLeft)
+            top = max(blockTop, chunkTop)
+            right = min(blockLeft + width, chunkLeft + self.CHUNK_SIZE)
+            bottom = min(blockTop + height, chunkTop + self.CHUNK_SIZE)
+            area[top - blockTop:bottom - blockTop, left - blockLeft:right - blockLeft] = chunks[(chunkX, chunkY)][top - chunkTop:bottom - chunkTop, left - chunkLeft:right - chunkLeft]
+        return area
 
 class Simple2DEnvironment(Environment):
+    MOORE_NEIGHBORHOOD = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+    WAKE_NEIGHBORHOOD = ((0, 0),) + MOORE_NEIGHBORHOOD
+    VON_NEUMANN_NEIGHBORHOOD = ((-1, 0), (0, -1), (0, 1), (1, 0))
+    BUCKET_SHIFT = 4
+    CHANGE_LOG_LIMIT = 4096
+    MAX_FAST_FORWARD_EXPONENT = 16
+    MAX_FAST_FORWARD_CELLS = 1 << 18
+
     def __init__(self, renderer):
         super().__init__(renderer)
+        # renderers from older simulator builds do not read cells from the environment
+        if hasattr(self._renderer, "setCellSource"):
+            self._renderer.setCellSource(self)
         self._stepCount = 0
         self._cellMap = {}
+        self._cellBuckets = None
+        self._bulkLife = False
+        self._hashLife = None
+        self._fastForwardExponent = 10
+
+        self._lifeFrontier = False
+        self._lifeFrontierRequested = False
+        self._scatterStep = -1
+        self._scatterOrigins = {}
+        self._scatterBrainType = None
+        self._scatterCounts = {}
+
+        self._eventWireWorld = False
+        self._wireGraph = None
+
+        self._sleepingCells = {}
+        self._fallingAsleep = []
+        self._wakePositions = []
+        self._deferredDeletes = []
+
+        self._changedPositions = set()
+        # nothing reads the change log until a renderer takes it for the first time
+        self._changeLogOverflowed = True
+        self._worldVersion = 0
+        self._random = RandomStream()
+        self._snapshots = SnapshotPublisher(self._fillSnapshot)
+        self._occupancy = None
+
+        self._exportFunctions = [
+            ExportFunction(self._toggleBulkLife, "Toggle bulk Life stepping", ControlElement.BUTTON),
+            ExportFunction(self._toggleLifeFrontier, "Toggle Life frontier mode", ControlElement.BUTTON),
+            ExportFunction(self._setFastForwardExponent, "Life fast-forward (2^n generations)", ControlElement.SLIDER, [0, self.MAX_FAST_FORWARD_EXPONENT, 10]),
+            ExportFunction(self._fastForwardLife, "Fast-forward Life", ControlElement.BUTTON),
+            ExportFunction(self._toggleEventWireWorld, "Toggle event-driven WireWorld", ControlElement.BUTTON)
+        ]
+
+    def _toggleBulkLife(self):
+        self._bulkLife = not self._bulkLife
+        if not self._bulkLife:
+            # per-cell Life brains expect to resume at the start of a generation
+            self._stepCount += -self._stepCount % 3
+
+    def isBulkLifeEnabled(self):
+        return self._bulkLife
+
+    def _toggleLifeFrontier(self):
+        # applied at the next generation boundary so brains never mix both modes within a generation
+        self._lifeFrontierRequested = not self._lifeFrontierRequested
+
+    def isLifeFrontierEnabled(self):
+        return self._lifeFrontier
+
+    def scatterToNeighbors(self, offsets, birthBrainType):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        if self._scatterStep != self._stepCount:
+            self._scatterStep = self._stepCount
+            self._scatterOrigins = {}
+
+        self._scatterBrainType = birthBrainType
+        origins = self._scatterOrigins.get(offsets)
+        if origins == None:
+            origins = []
+            self._scatterOrigins[offsets] = origins
+        origins.append((currentCell.cellData["xPosition"], currentCell.cellData["yPosition"]))
+
+    def getScatteredCount(self):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return 0
+        return self._scatterCounts.get((currentCell.cellData["xPosition"], currentCell.cellData["yPosition"]), 0)
+
+    def _resolveScatter(self):
+        # positions are packed into one int64 key, which limits frontier mode to coordinates within +-2^30
+        keyBias = 1 << 30
+        originKeys = []
+        targetKeys = []
+        for offsets, origins in self._scatterOrigins.items():
+            originPositions = np.array(origins, dtype=np.int64)
+            offsetArray = np.array(offsets, dtype=np.int64)
+            targets = (originPositions[:, np.newaxis, :] + offsetArray[np.newaxis, :, :]).reshape(-1, 2)
+            originKeys.append(((originPositions[:, 1] + keyBias) << 31) | (originPositions[:, 0] + keyBias))
+            targetKeys.append(((targets[:, 1] + keyBias) << 31) | (targets[:, 0] + keyBias))
+        self._scatterOrigins = {}
+
+        uniqueKeys, counts = np.unique(np.concatenate(targetKeys), return_counts=True)
+        originKeys = np.unique(np.concatenate(originKeys))
+        originIndices = np.minimum(np.searchsorted(uniqueKeys, originKeys), len(uniqueKeys) - 1)
+        originCounts = np.where(uniqueKeys[originIndices] == originKeys, counts[originIndices], 0)
+
+        def unpack(keys):
+            return zip(((keys & ((1 << 31) - 1)) - keyBias).tolist(), ((keys >> 31) - keyBias).tolist())
+
+        self._scatterCounts = dict(zip(unpack(originKeys), originCounts.tolist()))
+
+        birthKeys = np.setdiff1d(uniqueKeys[counts == 3], originKeys, assume_unique=True)
+        for xCoordinate, yCoordinate in unpack(birthKeys):
+            if self._checkForCellAbsolute(xCoordinate, yCoordinate):
+                continue
+            self._spawnCell(xCoordinate, yCoordinate, self._scatterBrainType(self))
+            self._scatterCounts[(xCoordinate, yCoordinate)] = 3
+
+    def _setFastForwardExponent(self, value):
+        self._fastForwardExponent = max(0, min(int(value), self.MAX_FAST_FORWARD_EXPONENT))
+
+    def _fastForwardLife(self):
+        aliveCells, deadCells, aliveBrainType = self._collectLifeCells()
+        self._removeCells(deadCells)
+        if len(aliveCells) == 0:
+            return
+
+        if self._hashLife == None:
+            self._hashLife = HashLife()
+
+        self._hashLife.setCells((cell.cellData["xPosition"], cell.cellData["yPosition"]) for cell in aliveCells)
+        self._hashLife.advance(self._fastForwardExponent)
+        # every live cell becomes a Cell object in the executor, a pattern that grew too far is not brought back
+        if self._hashLife.getPopulation() > self.MAX_FAST_FORWARD_CELLS:
+            return
+        newPositions = set(self._hashLife.getCells())
+
+        dyingCells = []
+        for cell in aliveCells:
+            position = (cell.cellData["xPosition"], cell.cellData["yPosition"])
+            if position in newPositions:
+                newPositions.discard(position)
+            else:
+                dyingCells.append(cell)
+
+        self._removeCells(dyingCells)
+        for xCoordinate, yCoordinate in newPositions:
+            self._spawnCell(xCoordinate, yCoordinate, aliveBrainType(self))
+
+        self._stepCount += -self._stepCount % 3
+
+    def _toggleEventWireWorld(self):
+        self._eventWireWorld = not self._eventWireWorld
+        self._wireGraph = None
+        if not self._eventWireWorld:
+            # per-cell WireWorld brains expect to resume at the start of a generation
+            self._stepCount += self._stepCount % 2
+
+    def isEventWireWorldEnabled(self):
+        return self._eventWireWorld
+
+    def _buildWireGraph(self):
+        cells = [cell for cell in self._cellExecutor.cellList if hasattr(type(cell.cellBrain), "WIREWORLD_STATE")]
+        cellCount = len(cells)
+        states = np.fromiter((type(cell.cellBrain).WIREWORLD_STATE for cell in cells), dtype=np.uint8, count=cellCount)
+        if cellCount == 0:
+            return WireGraph(cells, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), states)
+
+        keyBias = 1 << 30
+        xPositions = np.fromiter((cell.cellData["xPosition"] for cell in cells), dtype=np.int64, count=cellCount)
+        yPositions = np.fromiter((cell.cellData["yPosition"] for cell in cells), dtype=np.int64, count=cellCount)
+        keys = ((yPositions + keyBias) << 31) | (xPositions + keyBias)
+        keyOrder = np.argsort(keys)
+        sortedKeys = keys[keyOrder]
+
+        sources = []
+        targets = []
+        for xOffset, yOffset in self.MOORE_NEIGHBORHOOD:
+            neighborKeys = ((yPositions + yOffset + keyBias) << 31) | (xPositions + xOffset + keyBias)
+            found = np.minimum(np.searchsorted(sortedKeys, neighborKeys), cellCount - 1)
+            connected = sortedKeys[found] == neighborKeys
+            sources.append(np.nonzero(connected)[0])
+            targets.append(keyOrder[found[connected]])
+
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        edgeOrder = np.argsort(sources, kind="stable")
+        indptr = np.zeros(cellCount + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=cellCount), out=indptr[1:])
+        return WireGraph(cells, indptr, targets[edgeOrder], states)
+
+    def _eventWireWorldStep(self):
+        if self._wireGraph == None:
+            self._wireGraph = self._buildWireGraph()
+        graph = self._wireGraph
+
+        heads = graph.heads
+        tails = graph.tails
+        newHeads = heads[:0]
+        if heads.size > 0:
+            starts = graph.indptr[heads]
+            lengths = graph.indptr[heads + 1] - starts
+            edgePositions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+            neighbors = graph.indices[edgePositions]
+            candidates, headCounts = np.unique(neighbors[graph.states[neighbors] == 0], return_counts=True)
+            newHeads = candidates[(headCounts == 1) | (headCounts == 2)]
+
+        graph.states[tails] = 0
+        graph.states[heads] = 2
+        graph.states[newHeads] = 1
+        for index in np.concatenate((tails, heads, newHeads)).tolist():
+            cell = graph.cells[index]
+            self._setCellBrain(cell, type(cell.cellBrain).WIREWORLD_NEXT(self))
+
+        graph.tails = heads
+        graph.heads = newHeads
+
+    def _setCellBrain(self, cell, newCellBrain):
+        cell.cellBrain = newCellBrain
+        oldColor = cell.cellData["color"]
+        if hasattr(type(newCellBrain), "COLOR"):
+            cell.cellData["color"] = type(newCellBrain).COLOR
+        else:
+            cell.cellData["color"] = (255, 255, 255)
+        if self._occupancy != None:
+            self._occupancy.recordChange(cell.cellData["xPosition"], cell.cellData["yPosition"], 0, [newChannel - oldChannel for newChannel, oldChannel in zip(cell.cellData["color"], oldColor)])
+        self._logChange(cell.cellData["xPosition"], cell.cellData["yPosition"])
+        if len(self._sleepingCells) > 0 or len(self._fallingAsleep) > 0:
+            self._wakePositions.append((cell.cellData["xPosition"], cell.cellData["yPosition"]))
+
+    def sleepCurrentCell(self):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        # the cell stays with the executor but skips its turns from the end of the step until a cell next to it changes,
+        # changes logged before this call were already seen by the cell and do not keep it awake
+        self._fallingAsleep.append((currentCell, len(self._wakePositions)))
+
+    def _sleepingRun(self):
+        pass
+
+    def _wakeCell(self, cell):
+        cell.cellBrain.__dict__.pop("run", None)
+
+    def _updateSleepingCells(self):
+        wakePositions = self._wakePositions
+        self._wakePositions = []
+
+        for x, y in wakePositions:
+            for xOffset, yOffset in self.WAKE_NEIGHBORHOOD:
+                cell = self._sleepingCells.pop((x + xOffset, y + yOffset), None)
+                if cell is not None:
+                    self._wakeCell(cell)
+
+        # walking the new sleepers backwards grows the set of positions changed after each of them fell asleep
+        fallingAsleep = self._fallingAsleep
+        self._fallingAsleep = []
+        changedSince = set()
+        changedEnd = len(wakePositions)
+        handledCells = set()
+        for cell, wakeIndex in reversed(fallingAsleep):
+            changedSince.update(wakePositions[wakeIndex:changedEnd])
+            changedEnd = wakeIndex
+            if cell in handledCells:
+                continue
+            handledCells.add(cell)
+
+            x = cell.cellData["xPosition"]
+            y = cell.cellData["yPosition"]
+            if self._cellMap.get((x, y)) is not cell:
+                continue
+            if len(changedSince) > 0 and any((x + xOffset, y + yOffset) in changedSince for xOffset, yOffset in self.WAKE_NEIGHBORHOOD):
+                continue
+            # the override is set on the brain instance, the executor still calls run() but nothing happens
+            cell.cellBrain.run = self._sleepingRun
+            self._sleepingCells[(x, y)] = cell
+
+    def _wakeAllCells(self):
+        self._updateSleepingCells()
+        for cell in self._sleepingCells.values():
+            self._wakeCell(cell)
+        self._sleepingCells = {}
+
+    def getCellsInArea(self, left, top, right, bottom):
+        if right < left or bottom < top:
+            return []
+        # like the occupancy pyramid, the buckets are only built once someone asks for an area
+        if self._cellBuckets == None:
+            self._buildCellBuckets()
+
+        firstBucketX = int(left) >> self.BUCKET_SHIFT
+        firstBucketY = int(top) >> self.BUCKET_SHIFT
+        lastBucketX = int(right) >> self.BUCKET_SHIFT
+        lastBucketY = int(bottom) >> self.BUCKET_SHIFT
+
+        if (lastBucketX - firstBucketX + 1) * (lastBucketY - firstBucketY + 1) <= len(self._cellBuckets):
+            buckets = []
+            for bucketY in range(firstBucketY, lastBucketY + 1):
+                for bucketX in range(firstBucketX, lastBucketX + 1):
+                    bucket = self._cellBuckets.get((bucketX, bucketY))
+                    if bucket != None:
+                        buckets.append(((bucketX, bucketY), bucket))
+        else:
+            buckets = self._cellBuckets.items()
+
+        cells = []
+        for (bucketX, bucketY), bucket in buckets:
+            bucketLeft = bucketX << self.BUCKET_SHIFT
+            bucketTop = bucketY << self.BUCKET_SHIFT
+            bucketSize = 1 << self.BUCKET_SHIFT
+            if bucketLeft >= left and bucketTop >= top and bucketLeft + bucketSize - 1 <= right and bucketTop + bucketSize - 1 <= bottom:
+                cells.extend(bucket.values())
+                continue
+
+            for (x, y), cell in bucket.items():
+                if left <= x <= right and top <= y <= bottom:
+                    cells.append(cell)
+        return cells
+
+    def _buildCellBuckets(self):
+        self._cellBuckets = {}
+        for (x, y), cell in self._cellMap.items():
+            bucketKey = (int(x) >> self.BUCKET_SHIFT, int(y) >> self.BUCKET_SHIFT)
+            bucket = self._cellBuckets.get(bucketKey)
+            if bucket is None:
+                bucket = {}
+                self._cellBuckets[bucketKey] = bucket
+            bucket[(x, y)] = cell
+
+    def _logChange(self, x, y):
+        self._worldVersion += 1
+        if self._changeLogOverflowed:
+            return
+        self._changedPositions.add((x, y))
+        if len(self._changedPositions) > self.CHANGE_LOG_LIMIT:
+            self._invalidateChangeLog()
+
+    def _invalidateChangeLog(self):
+        self._worldVersion += 1
+        self._changeLogOverflowed = True
+        self._changedPositions = set()
+
+    def getRandom(self):
+        return self._random
+
+    def setRandomSeed(self, seed):
+        # an int or a numpy SeedSequence, e.g. one spawned per worker so parallel runs stay reproducible
+        self._random.seed(seed)
+
+    def getSnapshot(self):
+        # call between steps, the columns are only copied when the world changed since the last snapshot
+        return self._snapshots.get()
+
+    def _fillSnapshot(self, snapshot):
+        xPositions, yPositions, colors = self._collectCellColumns()
+        snapshot._fill({"xPosition": xPositions, "yPosition": yPositions, "color": colors}, None, len(xPositions))
+        snapshot.stepNumber = self._stepCount
+        snapshot.worldVersion = self._worldVersion
+
+    def getWorldVersion(self):
+        # bumped on every spawn, delete, move or color change so renderers can reuse unchanged frames
+        return self._worldVersion
+
+    def takeChangedPositions(self):
+        # None means the log overflowed or the world was replaced, so everything has to be redrawn
+        changedPositions = None if self._changeLogOverflowed else self._changedPositions
+        self._changedPositions = set()
+        self._changeLogOverflowed = False
+        return changedPositions
+
+    def getOccupancyArea(self, level, blockLeft, blockTop, width, height):
+        # the pyramid is only built once someone zooms out, then kept current through _updateCellMap
+        if self._occupancy == None:
+            self._occupancy = OccupancyPyramid()
+            xPositions, yPositions, colors = self._collectCellColumns()
+            self._occupancy.addCells(xPositions, yPositions, np.ones(len(xPositions), dtype=np.int64), colors)
+        return self._occupancy.getArea(level, blockLeft, blockTop, width, height)
+
+    def _collectCellColumns(self):
+        # positions and colors of every cell in the map as arrays, for snapshots and the occupancy pyramid
+        cells = list(self._cellMap.values())
+        cellCount = len(cells)
+        xPositions = np.fromiter((cell.cellData["xPosition"] for cell in cells), dtype=np.int64, count=cellCount)
+        yPositions = np.fromiter((cell.cellData["yPosition"] for cell in cells), dtype=np.int64, count=cellCount)
+        colors = np.array([tuple(cell.cellData["color"]) for cell in cells], dtype=np.uint8).reshape(cellCount, 3)
+        return xPositions, yPositions, colors
 
     def _updateCellMap(self, x, y, cell = None):
-        if cell == None:
-            self._cellMap.pop((x, y), None)
+        self._logChange(x, y)
+        if self._wireGraph is not None:
+            self._invalidateWireGraph([self._cellMap.get((x, y)), cell])
+        if self._occupancy is not None:
+            replacedCell = self._cellMap.get((x, y))
+            if replacedCell is not None:
+                self._occupancy.recordChange(x, y, -1, [-channel for channel in replacedCell.cellData["color"]])
+            if cell is not None:
+                self._occupancy.recordChange(x, y, 1, cell.cellData["color"])
+        if len(self._sleepingCells) > 0 or len(self._fallingAsleep) > 0:
+            self._wakePositions.append((x, y))
+
+        self._setMapEntry(x, y, cell)
+
+    def _setMapEntry(self, x, y, cell):
+        # the plain (x, y) dict answers point lookups, the buckets only serve area queries
+        position = (x, y)
+        if self._cellBuckets is None:
+            if cell is None:
+                self._cellMap.pop(position, None)
+            else:
+                self._cellMap[position] = cell
+            return
+
+        bucketKey = (int(x) >> self.BUCKET_SHIFT, int(y) >> self.BUCKET_SHIFT)
+        if cell is None:
+            if self._cellMap.pop(position, None) is not None:
+                bucket = self._cellBuckets[bucketKey]
+                del bucket[position]
+                if len(bucket) == 0:
+                    del self._cellBuckets[bucketKey]
+        else:
+            self._cellMap[position] = cell
+            bucket = self._cellBuckets.get(bucketKey)
+            if bucket is None:
+                bucket = {}
+                self._cellBuckets[bucketKey] = bucket
+            bucket[position] = cell
+
+    def _updateCellMapBatch(self, positions, cells = None):
+        # the same bookkeeping as _updateCellMap, but done once for a whole batch of positions
+        if len(positions) == 0:
+            return
+        self._worldVersion += 1
+        if not self._changeLogOverflowed:
+            self._changedPositions.update(positions)
+            if len(self._changedPositions) > self.CHANGE_LOG_LIMIT:
+                self._invalidateChangeLog()
+        if self._wireGraph != None:
+            self._invalidateWireGraph([self._cellMap.get(position) for position in positions])
+            if cells != None:
+                self._invalidateWireGraph(cells)
+        if self._occupancy != None:
+            for (x, y), replacedCell in zip(positions, [self._cellMap.get(position) for position in positions]):
+                if replacedCell is not None:
+                    self._occupancy.recordChange(x, y, -1, [-channel for channel in replacedCell.cellData["color"]])
+            if cells != None:
+                for (x, y), cell in zip(positions, cells):
+                    self._occupancy.recordChange(x, y, 1, cell.cellData["color"])
+        if len(self._sleepingCells) > 0 or len(self._fallingAsleep) > 0:
+            self._wakePositions.extend(positions)
+
+        if cells == None:
+            for x, y in positions:
+                self._setMapEntry(x, y, None)
         else:
-            self._cellMap[(x, y)] = cell
+            for (x, y), cell in zip(positions, cells):
+                self._setMapEntry(x, y, cell)
+
+    def _invalidateWireGraph(self, cells):
+        # the graph only has to be rebuilt when a WireWorld cell is placed or removed, other cells are not part of it
+        if any(cell is not None and hasattr(type(cell.cellBrain), "WIREWORLD_STATE") for cell in cells):
+            self._wireGraph = None
 
     def _rebuildCellMap(self):
+        self._wakeAllCells()
+        self._flushDeferredDeletes()
         self._cellMap = {}
+        self._cellBuckets = None
+        self._wireGraph = None
+        self._occupancy = None
 
         for cell in self._cellExecutor.cellList:
             self._updateCellMap(cell.cellData["xPosition"], cell.cellData["yPosition"], cell)
+        self._invalidateChangeLog()
         
     def _cellsCycled(self):
+        if len(self._deferredDeletes) > 0:
+            self._flushDeferredDeletes()
+
+        if self._scatterStep == self._stepCount and len(self._scatterOrigins) > 0:
+            self._resolveScatter()
+
         self._stepCount += 1
+        if self._lifeFrontier != self._lifeFrontierRequested and self._stepCount % 3 == 0:
+            self._lifeFrontier = self._lifeFrontierRequested
+            self._scatterCounts = {}
+            if self._lifeFrontier:
+                # leftover placeholders would count frontier births as neighbors mid-generation
+                self._removeCells(self._collectLifeCells()[1])
+
+        if self._bulkLife:
+            self._bulkLifeStep()
+        if self._eventWireWorld:
+            self._eventWireWorldStep()
+        if len(self._fallingAsleep) > 0 or len(self._wakePositions) > 0:
+            self._updateSleepingCells()
+
+        self._snapshots.invalidate()
+
+    def _addToExecutor(self, cells):
+        # executors without the bulk calls get the cells one at a time
+        if hasattr(self._cellExecutor, "addCells"):
+            self._cellExecutor.addCells(cells)
+        else:
+            for cell in cells:
+                self._cellExecutor.addCell(cell)
+
+    def _removeFromExecutor(self, cells):
+        if len(cells) == 0:
+            return
+        if hasattr(self._cellExecutor, "removeCells"):
+            self._cellExecutor.removeCells(cells)
+        else:
+            for cell in cells:
+                self._cellExecutor.removeCell(cell)
+
+    def _removeCells(self, cells):
+        self._updateCellMapBatch([(cell.cellData["xPosition"], cell.cellData["yPosition"]) for cell in cells])
+        self._removeFromExecutor(cells)
+
+    def _flushDeferredDeletes(self):
+        deferredDeletes = self._deferredDeletes
+        self._deferredDeletes = []
+        self._removeFromExecutor(deferredDeletes)
+
+    def _collectLifeCells(self):
+        aliveCells = []
+        deadCells = []
+        aliveBrainType = None
+        for cell in self._cellExecutor.cellList:
+            lifeState = getattr(type(cell.cellBrain), "LIFE_STATE", None)
+            if lifeState == None:
+                continue
+            if lifeState:
+                aliveCells.append(cell)
+                aliveBrainType = type(cell.cellBrain)
+            else:
+                deadCells.append(cell)
+        return aliveCells, deadCells, aliveBrainType
+
+    def _bulkLifeStep(self):
+        aliveCells, deadCells, aliveBrainType = self._collectLifeCells()
+        self._removeCells(deadCells)
+        if len(aliveCells) == 0:
+            return
+
+        cellCount = len(aliveCells)
+        xPositions = np.fromiter((cell.cellData["xPosition"] for cell in aliveCells), dtype=np.int64, count=cellCount)
+        yPositions = np.fromiter((cell.cellData["yPosition"] for cell in aliveCells), dtype=np.int64, count=cellCount)
+
+        # one cell of margin on every side so births next to the pattern are included
+        left = int(xPositions.min()) - 1
+        top = int(yPositions.min()) - 1
+        width = int(xPositions.max()) - left + 2
+        height = int(yPositions.max()) - top + 2
+
+        grid = np.zeros((height, width), dtype=np.uint8)
+        grid[yPositions - top, xPositions - left] = 1
+
+        paddedGrid = np.pad(grid, 1)
+        neighborCounts = np.zeros((height, width), dtype=np.uint8)
+        for yOffset in range(3):
+            for xOffset in range(3):
+                if xOffset == 1 and yOffset == 1:
+                    continue
+                neighborCounts += paddedGrid[yOffset:yOffset + height, xOffset:xOffset + width]
+
+        newGrid = (neighborCounts == 3) | ((grid == 1) & (neighborCounts == 2))
+
+        survived = newGrid[yPositions - top, xPositions - left]
+        self._removeCells([cell for cell, alive in zip(aliveCells, survived.tolist()) if not alive])
+
+        birthYPositions, birthXPositions = np.nonzero(newGrid & (grid == 0))
+        cellMap = self._cellMap
+        positions = [(xCoordinate, yCoordinate) for xCoordinate, yCoordinate in zip((birthXPositions + left).tolist(), (birthYPositions + top).tolist()) if (xCoordinate, yCoordinate) not in cellMap]
+        newCells = [self._newCell(xCoordinate, yCoordinate, aliveBrainType(self)) for xCoordinate, yCoordinate in positions]
+        self._addToExecutor(newCells)
+        self._updateCellMapBatch(positions, newCells)
 
     def _primaryClick(self, data):
         self._addUserCell(data)
@@ -31,10 +899,22 @@ class Simple2DEnvironment(Environment):
 
     def _executorClearedCells(self):
         self._cellMap = {}
+        self._cellBuckets = None
+        self._wireGraph = None
+        self._sleepingCells = {}
+        self._fallingAsleep = []
+        self._wakePositions = []
+        self._deferredDeletes = []
+        self._invalidateChangeLog()
+        self._occupancy = None
+
+        self._snapshots.invalidate()
 
     def _cellsChangedManually(self):
         self._rebuildCellMap()
 
+        self._snapshots.invalidate()
+
     def _addUserCell(self, data):
         xCoordinate = data[0]
         yCoordinate = data[1]
@@ -51,8 +931,9 @@ class Simple2DEnvironment(Environment):
         xCoordinate = data[0]
         yCoordinate = data[1]
 
-        if (xCoordinate, yCoordinate) in self._cellMap:
-            self._cellExecutor.removeCell(self._cellMap[(xCoordinate, yCoordinate)])
+        cell = self._cellMap.get((xCoordinate, yCoordinate))
+        if cell != None:
+            self._cellExecutor.removeCell(cell)
             
         self._updateCellMap(xCoordinate, yCoordinate)
 
@@ -63,9 +944,7 @@ class Simple2DEnvironment(Environment):
         self._userRemoveCell(newData)        
     
     def _checkForCellAbsolute(self, xCoordinate, yCoordinate):
-        if (xCoordinate, yCoordinate) in self._cellMap:
-            return True
-        return False
+        return (xCoordinate, yCoordinate) in self._cellMap
 
     def checkForCell(self, relativeXCoordinate, relativeYcoordinate):
         currentCell = self._cellExecutor.currentCell
@@ -91,15 +970,44 @@ class Simple2DEnvironment(Environment):
         checkedCellX = currentCellX + relativeXCoordinate
         checkedCellY = currentCellY + relativeYcoordinate
 
-        if (checkedCellX, checkedCellY) in self._cellMap:
-            return isinstance(self._cellMap[(checkedCellX, checkedCellY)].cellBrain, cellType)
+        checkedCell = self._cellMap.get((checkedCellX, checkedCellY))
+        if checkedCell != None:
+            return isinstance(checkedCell.cellBrain, cellType)
 
         return False
 
+    def _matchNeighborhood(self, offsets, cellType):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return [True] * len(offsets)
+
+        x = currentCell.cellData["xPosition"]
+        y = currentCell.cellData["yPosition"]
+        cellMap = self._cellMap
+        neighborCells = [cellMap.get((x + xOffset, y + yOffset)) for xOffset, yOffset in offsets]
+        return [cell is not None and isinstance(cell.cellBrain, cellType) for cell in neighborCells]
+
+    def countCellTypes(self, offsets, cellType):
+        return sum(self._matchNeighborhood(offsets, cellType))
+
+    def getCellTypeMask(self, offsets, cellType):
+        mask = 0
+        for index, matched in enumerate(self._matchNeighborhood(offsets, cellType)):
+            if matched:
+                mask |= 1 << index
+        return mask
+
     def _spawnCell(self, xCoordinate, yCoordinate, newCellBrain):
         if self._checkForCellAbsolute(xCoordinate, yCoordinate):
             return
 
+        newCell = self._newCell(xCoordinate, yCoordinate, newCellBrain)
+
+        self._cellExecutor.addCell(newCell)
+
+        self._updateCellMap(xCoordinate, yCoordinate, newCell)
+
+    def _newCell(self, xCoordinate, yCoordinate, newCellBrain):
         newCell = Cell(newCellBrain)
         newCell.cellData["xPosition"] = xCoordinate
         newCell.cellData["yPosition"] = yCoordinate
@@ -107,10 +1015,7 @@ class Simple2DEnvironment(Environment):
             newCell.cellData["color"] = type(newCellBrain).COLOR
         else:
             newCell.cellData["color"] = (255, 255, 255)
-        
-        self._cellExecutor.addCell(newCell)
-
-        self._updateCellMap(xCoordinate, yCoordinate, newCell)
+        return newCell
 
     def spawnCell(self, relativeXCoordinate, relativeYCoordinate, newCellBrain):
         if self.checkForCell(relativeXCoordinate, relativeYCoordinate):
@@ -120,6 +1025,42 @@ class Simple2DEnvironment(Environment):
 
         self._spawnCell(currentCell.cellData["xPosition"] + relativeXCoordinate, currentCell.cellData["yPosition"] + relativeYCoordinate, newCellBrain)
 
+    def spawnCells(self, spawns):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        currentCellX = currentCell.cellData["xPosition"]
+        currentCellY = currentCell.cellData["yPosition"]
+        cellMap = self._cellMap
+        spawnedPositions = set()
+        positions = []
+        newCells = []
+        for relativeXCoordinate, relativeYCoordinate, newCellBrain in spawns:
+            position = (currentCellX + relativeXCoordinate, currentCellY + relativeYCoordinate)
+            if position in cellMap or position in spawnedPositions:
+                continue
+            spawnedPositions.add(position)
+            positions.append(position)
+
+            # brain classes are only instantiated for targets that are actually free
+            if isinstance(newCellBrain, type):
+                newCellBrain = newCellBrain(self)
+            newCells.append(self._newCell(position[0], position[1], newCellBrain))
+
+        if len(newCells) > 0:
+            self._addToExecutor(newCells)
+            self._updateCellMapBatch(positions, newCells)
+
+    def deleteCurrentCellDeferred(self):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        # the position is freed right away, only the executor removal waits for the end of the cycle
+        self._updateCellMap(currentCell.cellData["xPosition"], currentCell.cellData["yPosition"])
+        self._deferredDeletes.append(currentCell)
+
     def deleteCurrentCell(self):
         currentCell = self._cellExecutor.currentCell
         if currentCell == None:
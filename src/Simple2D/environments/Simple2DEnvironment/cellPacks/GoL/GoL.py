@@ -2,23 +2,20 @@ from base_classes.CellBrain import CellBrain
 
 class DeadCell(CellBrain):
     COLOR = (0, 64, 255)
+    LIFE_STATE = 0
     def __init__(self, environment):
         super().__init__(environment)
         self.neighborCount = 2
     def run(self):
+        if self._environment.isBulkLifeEnabled():
+            return
+
         currentStep = self._environment.getCurrentStepNumber() % 3
 
         if currentStep == 0:
             return
         elif currentStep == 1:
-            self.neighborCount = 0
-            for xOffset in [-1, 0, 1]:
-                for yOffset in [-1, 0, 1]:
-                    if xOffset == 0 and yOffset == 0:
-                        continue
-
-                    if self._environment.checkIfCellTypeEqual(xOffset, yOffset, AliveCell):
-                        self.neighborCount += 1
+            self.neighborCount = self._environment.countCellTypes(self._environment.MOORE_NEIGHBORHOOD, AliveCell)
         else:
             if self.neighborCount == 3:
                 self._environment.deleteCurrentSpawnNewCell(AliveCell(self._environment))
@@ -28,27 +25,31 @@ class DeadCell(CellBrain):
 
 class AliveCell(CellBrain):
     COLOR = (0, 255, 255)
+    LIFE_STATE = 1
     def __init__(self, environment):
         super().__init__(environment)
         self.neighborCount = 2
     def run(self):
+        if self._environment.isBulkLifeEnabled():
+            return
+
         currentStep = self._environment.getCurrentStepNumber() % 3
+        frontier = self._environment.isLifeFrontierEnabled()
 
         if currentStep == 0:
-            for xOffset in [-1, 0, 1]:
-                for yOffset in [-1, 0, 1]:
-                    if xOffset == 0 and yOffset == 0:
-                        continue
+            if frontier:
+                self._environment.scatterToNeighbors(self._environment.MOORE_NEIGHBORHOOD, AliveCell)
+            else:
+                for xOffset, yOffset in self._environment.MOORE_NEIGHBORHOOD:
                     self._environment.spawnCell(xOffset, yOffset, DeadCell(self._environment))
         elif currentStep == 1:
-            self.neighborCount = 0
-            for xOffset in [-1, 0, 1]:
-                for yOffset in [-1, 0, 1]:
-                    if xOffset == 0 and yOffset == 0:
-                        continue
-                    
-                    if self._environment.checkIfCellTypeEqual(xOffset, yOffset, AliveCell):
-                        self.neighborCount += 1
+            if frontier:
+                self.neighborCount = self._environment.getScatteredCount()
+            else:
+                self.neighborCount = self._environment.countCellTypes(self._environment.MOORE_NEIGHBORHOOD, AliveCell)
         else:
             if self.neighborCount < 2 or self.neighborCount > 3:
-                self._environment.deleteCurrentSpawnNewCell(DeadCell(self._environment))
+                if frontier:
+                    self._environment.deleteCurrentCell()
+                else:
+                    self._environment.deleteCurrentSpawnNewCell(DeadCell(self._environment))
@@ -28,3 +28,4 @@ class Pattern(CellBrain):
             
         newCell = Pattern(self._environment, newChain, newNumber, newDirection)
         self._environment.spawnCell(directions[self.currentDirection][0], directions[self.currentDirection][1], newCell)
+        self._environment.sleepCurrentCell()
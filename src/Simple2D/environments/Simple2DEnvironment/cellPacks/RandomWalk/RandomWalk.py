@@ -1,5 +1,4 @@
 from base_classes.CellBrain import CellBrain
-import random
 
 class RandomWalk(CellBrain):
     COLOR = (255, 0, 0)
@@ -11,15 +10,16 @@ class RandomWalk(CellBrain):
 
     def run(self):
         if self.walked:
+            self._environment.sleepCurrentCell()
             return
         
-        newDirection = self.previousDirection
-        while newDirection == self.previousDirection:
-            newDirection = random.randint(0,3)
+        # any direction except the one the walk came from
+        newDirection = (self.previousDirection + self._environment.getRandom().randint(1, 3)) % 4
 
         newCell = RandomWalk(self._environment, (newDirection + 2) % 4)
         directions = [(-1, 0), (0, -1), (1, 0), (0, 1)]
         direction = directions[newDirection]
         self._environment.spawnCell(direction[0], direction[1], newCell)
         self.walked = True
+        self._environment.sleepCurrentCell()
         
\ No newline at end of file
@@ -4,10 +4,10 @@ class WhiteWall(CellBrain):
     COLOR = (255, 255, 255)
 
     def run(self):
-        pass
+        self._environment.sleepCurrentCell()
         
 class GrayWall(CellBrain):
     COLOR = (127, 127, 127)
 
     def run(self):
-        pass
\ No newline at end of file
+        self._environment.sleepCurrentCell()
\ No newline at end of file
@@ -3,12 +3,16 @@ import random
 
 class Wire(CellBrain):
     COLOR = (100, 100, 100)
+    WIREWORLD_STATE = 0
 
     def __init__(self, environment):
         super().__init__(environment)
         self.neighborCount = 0
 
     def run(self):
+        if self._environment.isEventWireWorldEnabled():
+            return
+
         currentStep = self._environment.getCurrentStepNumber() % 2
 
         if currentStep == 0:
@@ -20,21 +24,18 @@ class Wire(CellBrain):
             self._environment.deleteCurrentSpawnNewCell(Head(self._environment))
 
     def checkNeighbors(self):
-        self.neighborCount = 0
-        for xOffset in [-1, 0, 1]:
-            for yOffset in [-1, 0, 1]:
-                if xOffset == 0 and yOffset == 0:
-                    continue
+        self.neighborCount = self._environment.countCellTypes(self._environment.MOORE_NEIGHBORHOOD, Head)
 
-                if self._environment.checkIfCellTypeEqual(xOffset, yOffset, Head):
-                    self.neighborCount += 1
-            
 
         
 class Head(CellBrain):
     COLOR = (255, 255, 0)
+    WIREWORLD_STATE = 1
 
     def run(self):
+        if self._environment.isEventWireWorldEnabled():
+            return
+
         currentStep = self._environment.getCurrentStepNumber() % 2
 
         if currentStep == 1:
@@ -42,9 +43,17 @@ class Head(CellBrain):
 
 class Tail(CellBrain):
     COLOR = (255, 127, 0)
+    WIREWORLD_STATE = 2
 
     def run(self):
+        if self._environment.isEventWireWorldEnabled():
+            return
+
         currentStep = self._environment.getCurrentStepNumber() % 2
 
         if currentStep == 1:
-            self._environment.deleteCurrentSpawnNewCell(Wire(self._environment))
\ No newline at end of file
+            self._environment.deleteCurrentSpawnNewCell(Wire(self._environment))
+
+Wire.WIREWORLD_NEXT = Head
+Head.WIREWORLD_NEXT = Tail
+Tail.WIREWORLD_NEXT = Wire
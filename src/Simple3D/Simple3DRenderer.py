@@ -5,6 +5,8 @@ from ExportFunctions import ExportFunction, ControlElement
 from PIL import Image, ImageDraw
 import numpy as np
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from operator import itemgetter
 
 halfCubeWidth = 0.5
@@ -25,6 +27,10 @@ cubeQuads = [[0, 1, 2, 3],
              [1, 2, 6, 5],]
 
 class Simple3DRenderer(Renderer):
+    # encodings the GUI can decode; "raw", "image" and "array" are for in-process consumers via setOutputEncoding
+    DISPLAY_ENCODINGS = ("png", "png-fast", "bmp")
+    OUTPUT_ENCODINGS = DISPLAY_ENCODINGS + ("raw", "image", "array")
+
     def __init__(self, outputResolutionW, outputResolutionH):
         super().__init__(outputResolutionW, outputResolutionH)
 
@@ -48,11 +54,59 @@ class Simple3DRenderer(Renderer):
         self._exportFunctions = [ExportFunction(self._changeFOV, "FOV", ControlElement.SLIDER, [1, 1799, 900]),
                                  ExportFunction(self._changeMovementSpeed, "Movement speed", ControlElement.SLIDER, [1, 1000, int(self._cameraMovementSpeed * 100)]),
                                  ExportFunction(self._changeRotationSpeed, "Rotation speed", ControlElement.SLIDER, [1, 50, int(self._cameraRotationSpeed * 100)]),
-                                 ExportFunction(self._changeRenderDistance, "Render distance", ControlElement.SLIDER, [1, 250, int(self._renderDistance)])]
+                                 ExportFunction(self._changeRenderDistance, "Render distance", ControlElement.SLIDER, [1, 250, int(self._renderDistance)]),
+                                 ExportFunction(self._changeOutputEncoding, "Output encoding", ControlElement.SLIDER, [0, len(Simple3DRenderer.DISPLAY_ENCODINGS) - 1, 0]),
+                                 ExportFunction(self._changePngCompressLevel, "PNG compression", ControlElement.SLIDER, [0, 9, 6])]
 
         self._backgroundColor = (0, 0, 0, 255)
+        self._cellSource = None
+        self._cachedFrameKey = None
+        self._cachedFrame = None
+        self._outputEncoding = "png"
+        self._pngCompressLevel = 6
+        self._renderWorker = None
+        self._renderLock = threading.Lock()
 
     def render(self, cell3DList):
+        # renderAsync draws on a worker thread, the lock keeps it and direct calls from sharing the camera and frame cache mid-frame
+        with self._renderLock:
+            return self._renderCached(cell3DList)
+
+    def _renderCached(self, cell3DList):
+        self._currentFrame = time.perf_counter()
+        self._processMovement()
+        self._lastFrame = self._currentFrame
+
+        # "image" and "array" outputs can be modified by the caller, so only encoded bytes are reused
+        frameKey = None
+        worldVersion = None
+        if hasattr(cell3DList, "columns"):
+            worldVersion = cell3DList.worldVersion
+        elif self._cellSource != None:
+            worldVersion = self._cellSource.getWorldVersion()
+        if worldVersion != None and self._outputEncoding not in ("image", "array"):
+            frameKey = (worldVersion, tuple(self._cameraPosition), tuple(self._cameraRotation), self._FOV, self._renderDistance, self.outputResolutionW, self.outputResolutionH, tuple(self._backgroundColor), self._outputEncoding, self._pngCompressLevel)
+            if frameKey == self._cachedFrameKey:
+                return self._cachedFrame
+
+        outputFrame = self._renderFrame(cell3DList)
+        self._cachedFrameKey = frameKey
+        self._cachedFrame = outputFrame if frameKey != None else None
+        return outputFrame
+
+    def renderAsync(self, snapshot):
+        # renders a snapshot from getSnapshot() on a worker thread while the simulation keeps stepping, the snapshot is released once drawn
+        if self._renderWorker == None:
+            self._renderWorker = ThreadPoolExecutor(max_workers=1)
+        return self._renderWorker.submit(self._renderSnapshot, snapshot)
+
+    def _renderSnapshot(self, snapshot):
+        try:
+            return self.render(snapshot)
+        finally:
+            snapshot.release()
+
+    def _renderFrame(self, cell3DList):
         pitch, yaw, roll = self._cameraRotation
         self._transformationMatrix = self._getRotationMatrix(pitch, yaw, roll)
         
@@ -61,10 +115,6 @@ class Simple3DRenderer(Renderer):
         screenCenterX = outputBaseWidth / 2
         screenCenterY = outputBaseHeight / 2
 
-        self._currentFrame = time.perf_counter()
-        self._processMovement()
-        self._lastFrame = self._currentFrame
-
         fov_rad = np.radians(self._FOV)
         if fov_rad <= 0 or fov_rad >= np.pi:
             focal_mult = 1.0
@@ -74,30 +124,37 @@ class Simple3DRenderer(Renderer):
 
         if not cell3DList:
             outputImage = Image.new("RGBA", (outputBaseWidth, outputBaseHeight), color=self._backgroundColor)
-            buffer = BytesIO()
-            outputImage.save(buffer, format="PNG")
-            return buffer.getvalue()
+            return self._encodeImage(outputImage)
 
         count = len(cell3DList)
-        raw_positions = np.zeros((count, 3))
-        colors = np.empty(count, dtype=object)
+        if hasattr(cell3DList, "columns"):
+            columns = cell3DList.columns
+            raw_positions = np.stack((columns["xPosition"], columns["yPosition"], columns["zPosition"]), axis=1)
+            colors = None
+        else:
+            raw_positions = np.zeros((count, 3))
+            colors = np.empty(count, dtype=object)
 
-        for i, cell in enumerate(cell3DList):
-            data = cell.cellData
-            raw_positions[i] = (data["xPosition"], data["yPosition"], data["zPosition"])
-            colors[i] = data["color"]
+            for i, cell in enumerate(cell3DList):
+                data = cell.cellData
+                raw_positions[i] = (data["xPosition"], data["yPosition"], data["zPosition"])
+                colors[i] = data["color"]
 
         diff = np.abs(raw_positions - self._cameraPosition)
         mask = np.all(diff <= self._renderDistance, axis=1)
         
         positions = raw_positions[mask]
-        colors = colors[mask]
+        if colors is None:
+            # only the colors of cells within the render distance are turned into tuples
+            colors = np.empty(len(positions), dtype=object)
+            for i, color in enumerate(cell3DList.columns["color"][mask].tolist()):
+                colors[i] = tuple(color)
+        else:
+            colors = colors[mask]
         
         if len(positions) == 0:
             outputImage = Image.new("RGBA", (outputBaseWidth, outputBaseHeight), color=self._backgroundColor)
-            buffer = BytesIO()
-            outputImage.save(buffer, format="PNG")
-            return buffer.getvalue()
+            return self._encodeImage(outputImage)
 
         world_verts = positions[:, np.newaxis, :] + cubeVertices[np.newaxis, :, :]
         cam_verts = world_verts - self._cameraPosition
@@ -135,9 +192,7 @@ class Simple3DRenderer(Renderer):
 
         if not np.any(flat_valid):
             outputImage = Image.new("RGBA", (outputBaseWidth, outputBaseHeight), color=self._backgroundColor)
-            buffer = BytesIO()
-            outputImage.save(buffer, format="PNG")
-            return buffer.getvalue()
+            return self._encodeImage(outputImage)
 
         flat_X = Q_X[row_indices, top_3_indices].reshape(-1, 4)[flat_valid]
         flat_Y = Q_Y[row_indices, top_3_indices].reshape(-1, 4)[flat_valid]
@@ -181,8 +236,35 @@ class Simple3DRenderer(Renderer):
 
                     outputImage.paste(overlay, (minX, minY), overlay)
         
+        return self._encodeImage(outputImage)
+
+    def setCellSource(self, cellSource):
+        # cellSource provides getWorldVersion() so unchanged frames can be reused
+        self._cellSource = cellSource
+
+    def setOutputEncoding(self, encoding):
+        if encoding not in Simple3DRenderer.OUTPUT_ENCODINGS:
+            raise ValueError("Unknown output encoding: " + str(encoding))
+        self._outputEncoding = encoding
+
+    def getOutputEncoding(self):
+        return self._outputEncoding
+
+    def _encodeImage(self, outputImage):
+        if self._outputEncoding == "image":
+            return outputImage
+        if self._outputEncoding == "array":
+            return np.asarray(outputImage)
+        if self._outputEncoding == "raw":
+            return outputImage.tobytes()
+
         buffer = BytesIO()
-        outputImage.save(buffer, format="PNG")
+        if self._outputEncoding == "bmp":
+            outputImage.save(buffer, format="BMP")
+        elif self._outputEncoding == "png-fast":
+            outputImage.save(buffer, format="PNG", compress_level=1)
+        else:
+            outputImage.save(buffer, format="PNG", compress_level=self._pngCompressLevel)
         return buffer.getvalue()
 
     def _getCubePolygons(self, coordinates, color):
@@ -427,6 +509,12 @@ class Simple3DRenderer(Renderer):
     def _changeRenderDistance(self, distance):
         self._renderDistance = distance
 
+    def _changeOutputEncoding(self, index):
+        self._outputEncoding = Simple3DRenderer.DISPLAY_ENCODINGS[index]
+
+    def _changePngCompressLevel(self, level):
+        self._pngCompressLevel = level
+
     def _keyPressed(self, keyName):
         if keyName == "W" or keyName == "A" or keyName == "S" or keyName == "D" or keyName == "Q" or keyName == "E":
             if self._movementKeyCounter == 0:
@@ -2,26 +2,80 @@ from base_classes.Environment import Environment
 from base_classes.Cell import Cell
 from ExportFunctions import ExportFunction, ControlElement
 import random
+import numpy as np
 from collections import defaultdict
+import os
+import sys
+
+# helpers shared by several environments live in src/Shared, modules are loaded by file path so it is put on sys.path here
+sharedPath = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "Shared")
+if sharedPath not in sys.path:
+    sys.path.append(sharedPath)
+from CellSnapshot import SnapshotPublisher
 
 class Simple3DEnvironment(Environment):
+    WAKE_NEIGHBORHOOD = tuple((x, y, z) for x in range(-1, 2) for y in range(-1, 2) for z in range(-1, 2))
+
     def __init__(self, renderer):
         super().__init__(renderer)
+        if hasattr(self._renderer, "setCellSource"):
+            self._renderer.setCellSource(self)
 
         self._cellMap = {}
         self._stepCount = 0
+        self._worldVersion = 0
+        self._snapshots = SnapshotPublisher(self._fillSnapshot)
         
         # Spatial Indices for O(1) coordinate lookups
         self._xIndex = defaultdict(set)
         self._yIndex = defaultdict(set)
         self._zIndex = defaultdict(set)
 
+        self._deferredDeletes = []
+
+        self._sleepingCells = {}
+        self._fallingAsleep = []
+        self._wakePositions = []
+
+    def getSnapshot(self):
+        # call between steps, the cells are only gathered when the world changed since the last snapshot
+        return self._snapshots.get()
+
+    def _fillSnapshot(self, snapshot):
+        cellList = self._cellExecutor.cellList
+        cellCount = len(cellList)
+        columns = {
+            "xPosition": np.fromiter((cell.cellData["xPosition"] for cell in cellList), dtype=np.float64, count=cellCount),
+            "yPosition": np.fromiter((cell.cellData["yPosition"] for cell in cellList), dtype=np.float64, count=cellCount),
+            "zPosition": np.fromiter((cell.cellData["zPosition"] for cell in cellList), dtype=np.float64, count=cellCount),
+            "color": np.array([tuple(cell.cellData["color"])[:4] + (255,) * (4 - len(cell.cellData["color"])) for cell in cellList], dtype=np.uint8).reshape(cellCount, 4)
+        }
+        snapshot._fill(columns, None, cellCount)
+        snapshot.stepNumber = self._stepCount
+        snapshot.worldVersion = self._worldVersion
+
+    def getWorldVersion(self):
+        # bumped on every spawn or delete so the renderer can reuse unchanged frames
+        return self._worldVersion
+
     def _updateCellMap(self, x, y, z, cell = None):
+        self._worldVersion += 1
+        if len(self._sleepingCells) > 0 or len(self._fallingAsleep) > 0:
+            self._wakePositions.append((x, y, z))
         if cell == None:
             self._cellMap.pop((x, y, z), None)
         else:
             self._cellMap[(x, y, z)] = cell
 
+    def _updateCellMapBatch(self, positions, cells):
+        # places a batch of new cells with one version bump
+        self._worldVersion += 1
+        if len(self._sleepingCells) > 0 or len(self._fallingAsleep) > 0:
+            self._wakePositions.extend(positions)
+        self._cellMap.update(zip(positions, cells))
+        for (x, y, z), cell in zip(positions, cells):
+            self._addToIndices(x, y, z, cell)
+
     def _addToIndices(self, x, y, z, cell):
         self._xIndex[x].add(cell)
         self._yIndex[y].add(cell)
@@ -32,6 +86,60 @@ class Simple3DEnvironment(Environment):
         if cell in self._yIndex[y]: self._yIndex[y].discard(cell)
         if cell in self._zIndex[z]: self._zIndex[z].discard(cell)
 
+    def sleepCurrentCell(self):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        # the cell skips its turns from the end of the step until a cell next to it changes,
+        # changes logged before this call were already seen by the cell and do not keep it awake
+        self._fallingAsleep.append((currentCell, len(self._wakePositions)))
+
+    def _sleepingRun(self):
+        pass
+
+    def _wakeCell(self, cell):
+        cell.cellBrain.__dict__.pop("run", None)
+
+    def _updateSleepingCells(self):
+        wakePositions = self._wakePositions
+        self._wakePositions = []
+
+        for x, y, z in wakePositions:
+            for xOffset, yOffset, zOffset in self.WAKE_NEIGHBORHOOD:
+                cell = self._sleepingCells.pop((x + xOffset, y + yOffset, z + zOffset), None)
+                if cell is not None:
+                    self._wakeCell(cell)
+
+        # walking the new sleepers backwards grows the set of positions changed after each of them fell asleep
+        fallingAsleep = self._fallingAsleep
+        self._fallingAsleep = []
+        changedSince = set()
+        changedEnd = len(wakePositions)
+        handledCells = set()
+        for cell, wakeIndex in reversed(fallingAsleep):
+            changedSince.update(wakePositions[wakeIndex:changedEnd])
+            changedEnd = wakeIndex
+            if cell in handledCells:
+                continue
+            handledCells.add(cell)
+
+            x = cell.cellData["xPosition"]
+            y = cell.cellData["yPosition"]
+            z = cell.cellData["zPosition"]
+            if self._cellMap.get((x, y, z)) is not cell:
+                continue
+            if len(changedSince) > 0 and any((x + xOffset, y + yOffset, z + zOffset) in changedSince for xOffset, yOffset, zOffset in self.WAKE_NEIGHBORHOOD):
+                continue
+            cell.cellBrain.run = self._sleepingRun
+            self._sleepingCells[(x, y, z)] = cell
+
+    def _wakeAllCells(self):
+        self._updateSleepingCells()
+        for cell in self._sleepingCells.values():
+            self._wakeCell(cell)
+        self._sleepingCells = {}
+
     def getCurrentStepNumber(self):
         return self._stepCount
 
@@ -59,6 +167,70 @@ class Simple3DEnvironment(Environment):
 
         self._spawnCell(absoluteX, absoluteY, absoluteZ, newCellBrain)
 
+    def spawnCells(self, spawns):
+        currentCell = self._cellExecutor.currentCell
+        if not currentCell:
+            return
+
+        currentCellX = currentCell.cellData["xPosition"]
+        currentCellY = currentCell.cellData["yPosition"]
+        currentCellZ = currentCell.cellData["zPosition"]
+
+        spawnedPositions = set()
+        positions = []
+        newCells = []
+        for relativeX, relativeY, relativeZ, newCellBrain in spawns:
+            position = (relativeX + currentCellX, relativeY + currentCellY, relativeZ + currentCellZ)
+            if position in self._cellMap or position in spawnedPositions:
+                continue
+            spawnedPositions.add(position)
+
+            # brain classes are only instantiated for targets that are actually free
+            if isinstance(newCellBrain, type):
+                newCellBrain = newCellBrain(self)
+            positions.append(position)
+            newCells.append(self._newCell(position[0], position[1], position[2], newCellBrain))
+
+        if len(newCells) > 0:
+            self._addToExecutor(newCells)
+            self._updateCellMapBatch(positions, newCells)
+
+    def deleteCurrentCellDeferred(self):
+        currentCell = self._cellExecutor.currentCell
+        if currentCell == None:
+            return
+
+        currentCellX = currentCell.cellData["xPosition"]
+        currentCellY = currentCell.cellData["yPosition"]
+        currentCellZ = currentCell.cellData["zPosition"]
+
+        # the position is freed right away, only the executor removal waits for the end of the cycle
+        self._updateCellMap(currentCellX, currentCellY, currentCellZ)
+        self._removeFromIndices(currentCellX, currentCellY, currentCellZ, currentCell)
+        self._deferredDeletes.append(currentCell)
+
+    def _flushDeferredDeletes(self):
+        deferredDeletes = self._deferredDeletes
+        self._deferredDeletes = []
+        self._removeFromExecutor(deferredDeletes)
+
+    def _addToExecutor(self, cells):
+        # executors without the bulk calls get the cells one at a time
+        if hasattr(self._cellExecutor, "addCells"):
+            self._cellExecutor.addCells(cells)
+        else:
+            for cell in cells:
+                self._cellExecutor.addCell(cell)
+
+    def _removeFromExecutor(self, cells):
+        if len(cells) == 0:
+            return
+        if hasattr(self._cellExecutor, "removeCells"):
+            self._cellExecutor.removeCells(cells)
+        else:
+            for cell in cells:
+                self._cellExecutor.removeCell(cell)
+
     def deleteCurrentCell(self):
         currentCell = self._cellExecutor.currentCell
         if currentCell == None:
@@ -179,6 +351,14 @@ class Simple3DEnvironment(Environment):
         if (xCoordinate, yCoordinate, zCoordinate) in self._cellMap:
             return
             
+        newCell = self._newCell(xCoordinate, yCoordinate, zCoordinate, newCellBrain)
+        
+        self._cellExecutor.addCell(newCell)
+
+        self._updateCellMap(xCoordinate, yCoordinate, zCoordinate, newCell)
+        self._addToIndices(xCoordinate, yCoordinate, zCoordinate, newCell)
+
+    def _newCell(self, xCoordinate, yCoordinate, zCoordinate, newCellBrain):
         newCell = Cell(newCellBrain)
         newCell.cellData["xPosition"] = xCoordinate
         newCell.cellData["yPosition"] = yCoordinate
@@ -189,11 +369,7 @@ class Simple3DEnvironment(Environment):
             newCell.cellData["color"] = type(newCellBrain).COLOR
         else:
             newCell.cellData["color"] = (255, 255, 255)
-        
-        self._cellExecutor.addCell(newCell)
-
-        self._updateCellMap(xCoordinate, yCoordinate, zCoordinate, newCell)
-        self._addToIndices(xCoordinate, yCoordinate, zCoordinate, newCell)
+        return newCell
 
     def _addUserCell(self, position):
         xCoordinate = position[0]
@@ -221,13 +397,33 @@ class Simple3DEnvironment(Environment):
         return
 
     def _executorClearedCells(self):
+        self._worldVersion += 1
         self._cellMap = {}
+        self._deferredDeletes = []
+        self._sleepingCells = {}
+        self._fallingAsleep = []
+        self._wakePositions = []
         self._xIndex.clear()
         self._yIndex.clear()
         self._zIndex.clear()
 
+        self._snapshots.invalidate()
+
+    def _cellsChangedManually(self):
+        self._worldVersion += 1
+        self._wakeAllCells()
+
+        self._snapshots.invalidate()
+
     def _cellsCycled(self):
+        if len(self._deferredDeletes) > 0:
+            self._flushDeferredDeletes()
+
         self._stepCount += 1
+        if len(self._fallingAsleep) > 0 or len(self._wakePositions) > 0:
+            self._updateSleepingCells()
+
+        self._snapshots.invalidate()
 
     def _primaryClick(self, data):
         found = False
@@ -0,0 +1,74 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    simple2DModule = None
+
+R_PENTOMINO = [(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)]
+
+def createLifeWorld(positions, bulk):
+    environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+    if bulk:
+        environment._toggleBulkLife()
+    for xCoordinate, yCoordinate in positions:
+        environment._spawnCell(xCoordinate, yCoordinate, golModule.AliveCell(environment))
+    return environment, executor
+
+def getAlivePositions(executor):
+    return sorted((cell.cellData["xPosition"], cell.cellData["yPosition"]) for cell in executor.cellList if isinstance(cell.cellBrain, golModule.AliveCell))
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class BulkLifeTest(unittest.TestCase):
+    def _assertMatchesPerCellLife(self, positions, generations):
+        perCellEnvironment, perCellExecutor = createLifeWorld(positions, False)
+        bulkEnvironment, bulkExecutor = createLifeWorld(positions, True)
+
+        for generation in range(generations):
+            # per-cell Life takes three executor steps for one generation, bulk Life takes one
+            for _ in range(3):
+                perCellExecutor.step()
+            bulkExecutor.step()
+            self.assertEqual(getAlivePositions(bulkExecutor), getAlivePositions(perCellExecutor), "generation %d" % generation)
+
+    def test_rPentominoMatchesPerCellLife(self):
+        self._assertMatchesPerCellLife(R_PENTOMINO, 60)
+
+    def test_randomSoupMatchesPerCellLife(self):
+        randomStream = random.Random(1)
+        positions = set((randomStream.randint(-10, 10), randomStream.randint(-10, 10)) for _ in range(150))
+        self._assertMatchesPerCellLife(positions, 30)
+
+    def test_bulkStepLeavesNoDeadPlaceholders(self):
+        environment, executor = createLifeWorld(R_PENTOMINO, True)
+        for _ in range(10):
+            executor.step()
+
+        self.assertEqual(len(executor.cellList), len(getAlivePositions(executor)))
+        self.assertEqual(len(environment.getCellsInArea(-100, -100, 100, 100)), len(executor.cellList))
+
+    def test_perCellLifeResumesAfterBulkStepping(self):
+        perCellEnvironment, perCellExecutor = createLifeWorld(R_PENTOMINO, False)
+        bulkEnvironment, bulkExecutor = createLifeWorld(R_PENTOMINO, True)
+
+        for _ in range(5):
+            for _ in range(3):
+                perCellExecutor.step()
+            bulkExecutor.step()
+        bulkEnvironment._toggleBulkLife()
+        for _ in range(5 * 3):
+            perCellExecutor.step()
+            bulkExecutor.step()
+
+        self.assertEqual(getAlivePositions(bulkExecutor), getAlivePositions(perCellExecutor))
+
+if __name__ == "__main__":
+    unittest.main()
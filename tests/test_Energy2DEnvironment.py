@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    energy2DModule = loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+except ImportError:
+    energy2DModule = None
+
+class SelfDeletingBrain:
+    # deletes itself and keeps running genes afterwards, like a GeneticCell whose genome continues past a delete
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        self._environment.deleteCurrentCell()
+        self._environment.move(1, 0)
+
+@unittest.skipIf(energy2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class DeleteCurrentCellTest(unittest.TestCase):
+    def test_deletedCellDoesNotMoveBackIntoTheMap(self):
+        environment, executor = createWorld(energy2DModule.Energy2DEnvironment)
+        environment._spawnCell(0, 0, SelfDeletingBrain(environment))
+        executor.step()
+
+        self.assertEqual(executor.cellList, [])
+        self.assertEqual(environment.getCellsInArea(-5, -5, 5, 5), [])
+        self.assertFalse(environment._checkForCellAbsolute(1, 0))
+
+if __name__ == "__main__":
+    unittest.main()
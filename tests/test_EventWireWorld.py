@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    wireWorldModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/WireWorld/WireWorld.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    simple2DModule = None
+
+def createCircuit(eventDriven):
+    # two loops joined by a branch, with an electron in each loop
+    environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+    layout = {}
+    for x in range(40):
+        layout[(x, 0)] = wireWorldModule.Wire
+        layout[(x, 10)] = wireWorldModule.Wire
+    for y in range(11):
+        layout[(0, y)] = wireWorldModule.Wire
+        layout[(39, y)] = wireWorldModule.Wire
+    for x in range(5, 30):
+        layout[(x, 5)] = wireWorldModule.Wire
+    for y in range(6):
+        layout[(20, y)] = wireWorldModule.Wire
+    layout[(3, 0)] = wireWorldModule.Head
+    layout[(2, 0)] = wireWorldModule.Tail
+    layout[(0, 7)] = wireWorldModule.Head
+    layout[(0, 8)] = wireWorldModule.Tail
+
+    for (xCoordinate, yCoordinate), brainType in layout.items():
+        environment._spawnCell(xCoordinate, yCoordinate, brainType(environment))
+    if eventDriven:
+        environment._toggleEventWireWorld()
+    return environment, executor
+
+def getWorldState(environment):
+    return sorted((cell.cellData["xPosition"], cell.cellData["yPosition"], type(cell.cellBrain).__name__, tuple(cell.cellData["color"])) for cell in environment.getCellsInArea(-100, -100, 100, 100))
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class EventWireWorldTest(unittest.TestCase):
+    def setUp(self):
+        self.perCellEnvironment, self.perCellExecutor = createCircuit(False)
+        self.eventEnvironment, self.eventExecutor = createCircuit(True)
+
+    def _stepAndCompare(self, generations):
+        for generation in range(generations):
+            # per-cell WireWorld takes two executor steps for one generation, the event-driven mode takes one
+            self.perCellExecutor.step()
+            self.perCellExecutor.step()
+            self.eventExecutor.step()
+            self.assertEqual(getWorldState(self.eventEnvironment), getWorldState(self.perCellEnvironment), "generation %d" % generation)
+
+    def test_matchesPerCellWireWorld(self):
+        self._stepAndCompare(200)
+        self.assertEqual(len(self.eventExecutor.cellList), len(self.perCellExecutor.cellList))
+
+    def test_switchingModesMidRun(self):
+        self._stepAndCompare(30)
+        self.eventEnvironment._toggleEventWireWorld()
+        for _ in range(20):
+            self.perCellExecutor.step()
+            self.eventExecutor.step()
+        self.assertEqual(getWorldState(self.eventEnvironment), getWorldState(self.perCellEnvironment))
+
+        self.eventEnvironment._toggleEventWireWorld()
+        self._stepAndCompare(30)
+
+    def test_editedWiresAreStepped(self):
+        self._stepAndCompare(15)
+        for environment in (self.perCellEnvironment, self.eventEnvironment):
+            environment._userRemoveCell((10, 5))
+            environment._spawnCell(20, 6, wireWorldModule.Wire(environment))
+            environment._cellsChangedManually()
+        self._stepAndCompare(40)
+
+    def test_graphIsOnlyRebuiltForWireChanges(self):
+        self._stepAndCompare(2)
+        graph = self.eventEnvironment._wireGraph
+
+        # cells that are not part of the circuit leave the graph alone
+        self.eventEnvironment._spawnCell(50, 50, golModule.DeadCell(self.eventEnvironment))
+        self.eventExecutor.step()
+        self.assertIs(self.eventEnvironment._wireGraph, graph)
+
+        self.eventEnvironment._spawnCell(40, 0, wireWorldModule.Wire(self.eventEnvironment))
+        self.assertIsNone(self.eventEnvironment._wireGraph)
+
+if __name__ == "__main__":
+    unittest.main()
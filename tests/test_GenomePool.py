@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    energy2DModule = loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+    geneticModule = loadModule("Simple2D/environments/Energy2DEnvironment/CellPacks/GeneticCell.py")
+except ImportError:
+    energy2DModule = None
+
+def createPopulation(seed):
+    environment, executor = createWorld(energy2DModule.Energy2DEnvironment, seed = seed)
+    for xPosition in range(-10, 11, 2):
+        for yPosition in range(-10, 11, 2):
+            environment._spawnCell(xPosition, yPosition, geneticModule.GeneticCell(environment))
+    return environment, executor
+
+@unittest.skipIf(energy2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class GenomePoolTest(unittest.TestCase):
+    def _assertCountsMatchLiveCells(self, environment, executor):
+        genomeCounts = Counter(cell.cellBrain.genome for cell in executor.cellList)
+        genomePool = environment.getGenomePool()
+        self.assertEqual(genomePool.getDiversity(), len(genomeCounts))
+        for genome, count in genomeCounts.items():
+            self.assertEqual(genomePool.getReferenceCount(genome), count)
+
+    def test_internSharesEqualGenomes(self):
+        genomePool = energy2DModule.GenomePool()
+        first = genomePool.intern([1, 2, 3])
+        second = genomePool.intern((1, 2, 3))
+        self.assertIs(first, second)
+        self.assertEqual(genomePool.getReferenceCount(first), 2)
+
+        genomePool.release(first)
+        self.assertEqual(genomePool.getReferenceCount(first), 1)
+        genomePool.release(first)
+        self.assertEqual(len(genomePool), 0)
+        # releasing an unknown genome is ignored
+        genomePool.release((4, 5, 6))
+        self.assertEqual(len(genomePool), 0)
+
+    def test_countsFollowThePopulation(self):
+        environment, executor = createPopulation(11)
+        for step in range(60):
+            executor.step()
+            if step % 10 == 9:
+                self._assertCountsMatchLiveCells(environment, executor)
+
+    def test_unspawnedBrainsAreReleased(self):
+        environment, executor = createPopulation(12)
+        diversity = environment.getGenomePool().getDiversity()
+        # the position is taken, so the new brain never becomes a cell
+        environment._spawnCell(0, 0, geneticModule.GeneticCell(environment))
+        self.assertEqual(environment.getGenomePool().getDiversity(), diversity)
+        self._assertCountsMatchLiveCells(environment, executor)
+
+    def test_cellsRemovedByHandAreReleased(self):
+        environment, executor = createPopulation(13)
+        for _ in range(10):
+            executor.step()
+        for cell in executor.cellList[:len(executor.cellList) // 2]:
+            executor.removeCell(cell)
+        executor.cellsChangedManually()
+        self._assertCountsMatchLiveCells(environment, executor)
+
+    def test_clearingReleasesEveryGenome(self):
+        environment, executor = createPopulation(14)
+        for _ in range(10):
+            executor.step()
+        executor.clearCells()
+        self.assertEqual(len(environment.getGenomePool()), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    simple2DModule = None
+
+R_PENTOMINO = [(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)]
+GLIDER = [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]
+
+def lifeGeneration(positions):
+    neighborCounts = {}
+    for xCoordinate, yCoordinate in positions:
+        for xOffset in range(-1, 2):
+            for yOffset in range(-1, 2):
+                if xOffset != 0 or yOffset != 0:
+                    neighbor = (xCoordinate + xOffset, yCoordinate + yOffset)
+                    neighborCounts[neighbor] = neighborCounts.get(neighbor, 0) + 1
+    return set(position for position, count in neighborCounts.items() if count == 3 or (count == 2 and position in positions))
+
+def getAlivePositions(executor):
+    return sorted((cell.cellData["xPosition"], cell.cellData["yPosition"]) for cell in executor.cellList if isinstance(cell.cellBrain, golModule.AliveCell))
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class HashLifeTest(unittest.TestCase):
+    def _assertMatchesReference(self, positions, exponents):
+        hashLife = simple2DModule.HashLife()
+        hashLife.setCells(positions)
+        expected = set(positions)
+        for exponent in exponents:
+            hashLife.advance(exponent)
+            for _ in range(1 << exponent):
+                expected = lifeGeneration(expected)
+            self.assertEqual(sorted(hashLife.getCells()), sorted(expected), "exponent %d" % exponent)
+            self.assertEqual(hashLife.getPopulation(), len(expected))
+
+    def test_rPentominoMatchesGenerationByGeneration(self):
+        self._assertMatchesReference(R_PENTOMINO, [0, 1, 2, 3, 4, 5, 6])
+
+    def test_gliderMovesOneCellEveryFourGenerations(self):
+        hashLife = simple2DModule.HashLife()
+        hashLife.setCells(GLIDER)
+        hashLife.advance(10)
+        self.assertEqual(sorted(hashLife.getCells()), sorted((x + 256, y + 256) for x, y in GLIDER))
+
+    def test_randomSoupAtNegativeCoordinates(self):
+        randomStream = random.Random(2)
+        positions = set((randomStream.randint(-40, -20), randomStream.randint(-40, -20)) for _ in range(120))
+        self._assertMatchesReference(positions, [3, 0, 5])
+
+    def test_garbageCollectionKeepsTheResult(self):
+        hashLife = simple2DModule.HashLife(maxResults = 64, maxNodes = 64)
+        hashLife.setCells(R_PENTOMINO)
+        expected = set(R_PENTOMINO)
+        for _ in range(4):
+            hashLife.advance(4)
+            for _ in range(16):
+                expected = lifeGeneration(expected)
+        self.assertEqual(sorted(hashLife.getCells()), sorted(expected))
+
+    def test_fastForwardMatchesPerCellLife(self):
+        perCellEnvironment, perCellExecutor = createWorld(simple2DModule.Simple2DEnvironment)
+        fastEnvironment, fastExecutor = createWorld(simple2DModule.Simple2DEnvironment)
+        for environment in (perCellEnvironment, fastEnvironment):
+            for xCoordinate, yCoordinate in R_PENTOMINO:
+                environment._spawnCell(xCoordinate, yCoordinate, golModule.AliveCell(environment))
+
+        fastEnvironment._setFastForwardExponent(4)
+        fastEnvironment._fastForwardLife()
+        for _ in range(16 * 3):
+            perCellExecutor.step()
+        self.assertEqual(getAlivePositions(fastExecutor), getAlivePositions(perCellExecutor))
+
+        # per-cell stepping carries on from the fast-forwarded pattern
+        for _ in range(5 * 3):
+            perCellExecutor.step()
+            fastExecutor.step()
+        self.assertEqual(getAlivePositions(fastExecutor), getAlivePositions(perCellExecutor))
+
+    def test_fastForwardExponentIsClamped(self):
+        environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+        environment._setFastForwardExponent(30)
+        self.assertEqual(environment._fastForwardExponent, simple2DModule.Simple2DEnvironment.MAX_FAST_FORWARD_EXPONENT)
+        environment._setFastForwardExponent(-3)
+        self.assertEqual(environment._fastForwardExponent, 0)
+
+    def test_fastForwardLeavesTooLargePatternsAlone(self):
+        environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+        environment.MAX_FAST_FORWARD_CELLS = 10
+        for xCoordinate, yCoordinate in R_PENTOMINO:
+            environment._spawnCell(xCoordinate, yCoordinate, golModule.AliveCell(environment))
+
+        environment._setFastForwardExponent(6)
+        environment._fastForwardLife()
+        self.assertEqual(getAlivePositions(executor), sorted(R_PENTOMINO))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    rendererModule = loadModule("Simple2D/Simple2DRenderer.py")
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+    wireWorldModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/WireWorld/WireWorld.py")
+except ImportError:
+    rendererModule = None
+
+def createRenderedWorld():
+    renderer = rendererModule.Simple2DRenderer(160, 120)
+    renderer.setOutputEncoding("array")
+    environment, executor = createWorld(simple2DModule.Simple2DEnvironment, renderer)
+    return renderer, environment, executor
+
+@unittest.skipIf(rendererModule == None, "needs the simulator's base_classes and PIL, pass the simulator path in OCL_SIMULATOR_PATH")
+class IncrementalRenderTest(unittest.TestCase):
+    def setUp(self):
+        self.renderer, self.environment, self.executor = createRenderedWorld()
+        # the reference renderer has no cell source, so it rasterizes the full cell list every frame
+        self.referenceRenderer = rendererModule.Simple2DRenderer(160, 120)
+        self.referenceRenderer.setOutputEncoding("array")
+        self.randomStream = random.Random(6)
+
+    def _moveCamera(self):
+        action = self.randomStream.random()
+        if action < 0.3:
+            self.renderer._setMoveSpeed(self.randomStream.randint(1, 25))
+            self.randomStream.choice([self.renderer._moveUp, self.renderer._moveDown, self.renderer._moveLeft, self.renderer._moveRight])()
+        elif action < 0.4:
+            # drags can leave the camera between pixels, which has to force a full redraw
+            self.renderer._primaryDrag((0, 0), (self.randomStream.randint(-50, 50), self.randomStream.randint(-50, 50)))
+        elif action < 0.45 and self.renderer._scale < 32:
+            self.renderer._zoomIn()
+        elif action < 0.5 and self.renderer._scale > 1:
+            self.renderer._zoomOut()
+        elif action < 0.55:
+            self.renderer._setMoveSpeed(self.randomStream.randint(200, 600))
+            self.renderer._moveLeft()
+
+    def _assertFramesMatch(self, steps):
+        for step in range(steps):
+            self.executor.step()
+            self._moveCamera()
+            self.referenceRenderer._scale = self.renderer._scale
+            self.referenceRenderer._xCenterPosition = self.renderer._xCenterPosition
+            self.referenceRenderer._yCenterPosition = self.renderer._yCenterPosition
+
+            frame = self.renderer.render(self.executor.cellList)
+            referenceFrame = self.referenceRenderer.render(self.executor.cellList)
+            self.assertTrue((frame == referenceFrame).all(), "step %d" % step)
+
+    def test_lifeMatchesFullRedraw(self):
+        randomStream = random.Random(7)
+        for _ in range(300):
+            self.environment._spawnCell(randomStream.randint(-20, 20), randomStream.randint(-15, 15), golModule.AliveCell(self.environment))
+        self._assertFramesMatch(150)
+
+    def test_recoloredCellsMatchFullRedraw(self):
+        for x in range(-30, 30):
+            self.environment._spawnCell(x, 0, wireWorldModule.Wire(self.environment))
+            self.environment._spawnCell(x, 4, wireWorldModule.Wire(self.environment))
+        for y in range(5):
+            self.environment._spawnCell(-30, y, wireWorldModule.Wire(self.environment))
+            self.environment._spawnCell(30, y, wireWorldModule.Wire(self.environment))
+        self.environment._userRemoveCell((0, 0))
+        self.environment._spawnCell(0, 0, wireWorldModule.Head(self.environment))
+        # event-driven WireWorld swaps brains in place instead of deleting and spawning cells
+        self.environment._toggleEventWireWorld()
+        self._assertFramesMatch(120)
+
+    def test_clearingTheWorldRedrawsTheFrame(self):
+        self.environment._spawnCell(0, 0, golModule.AliveCell(self.environment))
+        self.renderer.render(self.executor.cellList)
+        self.executor.clearCells()
+
+        frame = self.renderer.render(self.executor.cellList)
+        self.assertTrue((frame == self.referenceRenderer.render([])).all())
+
+if __name__ == "__main__":
+    unittest.main()
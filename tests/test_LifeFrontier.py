@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    simple2DModule = None
+
+R_PENTOMINO = [(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)]
+
+def createLifeWorld(positions, frontier):
+    environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+    if frontier:
+        environment._toggleLifeFrontier()
+    for xCoordinate, yCoordinate in positions:
+        environment._spawnCell(xCoordinate, yCoordinate, golModule.AliveCell(environment))
+    return environment, executor
+
+def getAlivePositions(executor):
+    return sorted((cell.cellData["xPosition"], cell.cellData["yPosition"]) for cell in executor.cellList if isinstance(cell.cellBrain, golModule.AliveCell))
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class LifeFrontierTest(unittest.TestCase):
+    def _assertMatchesPerCellLife(self, positions, generations):
+        perCellEnvironment, perCellExecutor = createLifeWorld(positions, False)
+        frontierEnvironment, frontierExecutor = createLifeWorld(positions, True)
+
+        for generation in range(generations):
+            for _ in range(3):
+                perCellExecutor.step()
+                frontierExecutor.step()
+            self.assertEqual(getAlivePositions(frontierExecutor), getAlivePositions(perCellExecutor), "generation %d" % generation)
+        return frontierEnvironment, frontierExecutor
+
+    def test_rPentominoMatchesPerCellLife(self):
+        self._assertMatchesPerCellLife(R_PENTOMINO, 80)
+
+    def test_randomSoupMatchesPerCellLife(self):
+        randomStream = random.Random(5)
+        positions = set((randomStream.randint(-10, 10), randomStream.randint(-10, 10)) for _ in range(150))
+        self._assertMatchesPerCellLife(positions, 30)
+
+    def test_frontierModeKeepsNoDeadPlaceholders(self):
+        environment, executor = self._assertMatchesPerCellLife(R_PENTOMINO, 10)
+        self.assertTrue(environment.isLifeFrontierEnabled())
+        self.assertEqual(len(executor.cellList), len(getAlivePositions(executor)))
+
+    def test_switchingBackToPerCellLife(self):
+        perCellEnvironment, perCellExecutor = createLifeWorld(R_PENTOMINO, False)
+        frontierEnvironment, frontierExecutor = createLifeWorld(R_PENTOMINO, True)
+
+        for step in range(60 * 3):
+            # requested mid-generation, the switch waits for the next generation boundary
+            if step == 31:
+                frontierEnvironment._toggleLifeFrontier()
+            perCellExecutor.step()
+            frontierExecutor.step()
+            if step % 3 == 2:
+                self.assertEqual(getAlivePositions(frontierExecutor), getAlivePositions(perCellExecutor), "step %d" % step)
+        self.assertFalse(frontierEnvironment.isLifeFrontierEnabled())
+
+if __name__ == "__main__":
+    unittest.main()
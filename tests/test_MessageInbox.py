@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    energy2DModule = loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+except ImportError:
+    energy2DModule = None
+
+class SenderBrain:
+    # sends its messages to the cell on its right, one per step
+    def __init__(self, environment, messages):
+        self._environment = environment
+        self._messages = list(messages)
+
+    def run(self):
+        if len(self._messages) > 0:
+            self._environment.sendMessage(1, 0, self._messages.pop(0))
+
+class ReceiverBrain:
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        pass
+
+def drain(inbox):
+    messages = []
+    while len(inbox) > 0:
+        messages.append(inbox.pop())
+    return messages
+
+@unittest.skipIf(energy2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class MessageInboxTest(unittest.TestCase):
+    def test_messagesComeOutInArrivalOrder(self):
+        inbox = energy2DModule.MessageInbox()
+        self.assertIsNone(inbox.pop())
+        for message in range(5):
+            self.assertFalse(inbox.push(message, 8, False))
+        self.assertEqual(inbox.pop(), 0)
+        inbox.push(5, 8, False)
+        self.assertEqual(drain(inbox), [1, 2, 3, 4, 5])
+
+    def test_fullInboxDropsTheNewestMessage(self):
+        inbox = energy2DModule.MessageInbox()
+        for message in range(3):
+            inbox.push(message, 3, False)
+        self.assertTrue(inbox.push(3, 3, False))
+        self.assertEqual(drain(inbox), [0, 1, 2])
+
+    def test_fullInboxDropsTheOldestMessage(self):
+        inbox = energy2DModule.MessageInbox()
+        for message in range(5):
+            inbox.push(message, 3, True)
+        self.assertEqual(len(inbox), 3)
+        self.assertEqual(drain(inbox), [2, 3, 4])
+
+    def test_shrinkingKeepsTheNewestMessages(self):
+        inbox = energy2DModule.MessageInbox([0, 1, 2, 3, 4, 5])
+        inbox.push(6, 3, True)
+        self.assertEqual(drain(inbox), [4, 5, 6])
+
+    def test_deliveryThroughTheEnvironment(self):
+        environment, executor = createWorld(energy2DModule.Energy2DEnvironment)
+        environment._setInboxCapacity(2)
+        sentList = [1, 2]
+        environment._spawnCell(0, 0, SenderBrain(environment, [sentList, "b", "c"]))
+        environment._spawnCell(1, 0, ReceiverBrain(environment))
+        receiverCell = environment._cellMap[(1, 0)]
+
+        executor.step()
+        self.assertEqual(environment.getMessageCounters(), {"sent": 1, "delivered": 1, "dropped": 0})
+        # the receiver gets a frozen copy of a sent list
+        sentList.append(3)
+        executor.step()
+        executor.step()
+        self.assertEqual(environment.getMessageCounters(), {"sent": 1, "delivered": 0, "dropped": 1})
+        self.assertEqual(drain(receiverCell.cellData["messages"]), [(1, 2), "b"])
+
+    def test_dropOldestPolicyThroughTheEnvironment(self):
+        environment, executor = createWorld(energy2DModule.Energy2DEnvironment)
+        environment._setInboxCapacity(2)
+        environment.setMessageDropPolicy("drop-oldest")
+        environment._spawnCell(0, 0, SenderBrain(environment, ["a", "b", "c"]))
+        environment._spawnCell(1, 0, ReceiverBrain(environment))
+
+        for _ in range(3):
+            executor.step()
+        self.assertEqual(environment.getMessageCounters(), {"sent": 1, "delivered": 1, "dropped": 1})
+        self.assertEqual(drain(environment._cellMap[(1, 0)].cellData["messages"]), ["b", "c"])
+        self.assertRaises(ValueError, environment.setMessageDropPolicy, "drop-random")
+
+if __name__ == "__main__":
+    unittest.main()
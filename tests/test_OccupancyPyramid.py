@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    rendererModule = loadModule("Simple2D/Simple2DRenderer.py")
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    rendererModule = None
+
+def sumBlocks(cells, level, blockLeft, blockTop, width, height):
+    area = np.zeros((height, width, 4), dtype=np.int64)
+    for (x, y), color in cells.items():
+        blockX = (x >> level) - blockLeft
+        blockY = (y >> level) - blockTop
+        if 0 <= blockX < width and 0 <= blockY < height:
+            area[blockY, blockX] += (1,) + tuple(color)
+    return area
+
+@unittest.skipIf(rendererModule == None, "needs the simulator's base_classes and PIL, pass the simulator path in OCL_SIMULATOR_PATH")
+class OccupancyPyramidTest(unittest.TestCase):
+    def test_levelsSumTheCellsBelowThem(self):
+        pyramid = simple2DModule.OccupancyPyramid()
+        randomStream = random.Random(8)
+        cells = {}
+        for _ in range(3000):
+            position = (randomStream.randint(-300, 300), randomStream.randint(-300, 300))
+            color = (randomStream.randint(0, 255), randomStream.randint(0, 255), randomStream.randint(0, 255))
+            if position in cells:
+                pyramid.recordChange(position[0], position[1], -1, [-channel for channel in cells.pop(position)])
+            else:
+                pyramid.recordChange(position[0], position[1], 1, color)
+                cells[position] = color
+
+        for level in (1, 3, 6, 10):
+            blockLeft = -700 >> level
+            blockTop = -700 >> level
+            size = (1400 >> level) + 2
+            area = pyramid.getArea(level, blockLeft, blockTop, size, size)
+            self.assertTrue((area == sumBlocks(cells, level, blockLeft, blockTop, size, size)).all(), "level %d" % level)
+
+    def test_environmentKeepsThePyramidCurrent(self):
+        environment, executor = createWorld(simple2DModule.Simple2DEnvironment)
+        randomStream = random.Random(9)
+        for _ in range(400):
+            environment._spawnCell(randomStream.randint(-30, 30), randomStream.randint(-30, 30), golModule.AliveCell(environment))
+        environment.getOccupancyArea(2, -10, -10, 20, 20)
+
+        for _ in range(30):
+            executor.step()
+        cells = dict(((cell.cellData["xPosition"], cell.cellData["yPosition"]), cell.cellData["color"]) for cell in executor.cellList)
+        self.assertTrue((environment.getOccupancyArea(2, -40, -40, 80, 80) == sumBlocks(cells, 2, -40, -40, 80, 80)).all())
+
+    def test_zoomedOutFrameMatchesTheCellListPath(self):
+        renderer = rendererModule.Simple2DRenderer(160, 120)
+        renderer.setOutputEncoding("array")
+        environment, executor = createWorld(simple2DModule.Simple2DEnvironment, renderer)
+        # without a cell source the renderer bins the cell list itself instead of reading the pyramid
+        referenceRenderer = rendererModule.Simple2DRenderer(160, 120)
+        referenceRenderer.setOutputEncoding("array")
+
+        randomStream = random.Random(10)
+        for _ in range(2000):
+            environment._spawnCell(randomStream.randint(-200, 200), randomStream.randint(-150, 150), golModule.AliveCell(environment))
+
+        for step in range(40):
+            executor.step()
+            renderer.setScale(0.5 ** (1 + step % 4))
+            renderer._xCenterPosition = randomStream.randint(-100, 100)
+            renderer._yCenterPosition = randomStream.randint(-100, 100)
+            for name in ("_scale", "_xCenterPosition", "_yCenterPosition"):
+                setattr(referenceRenderer, name, getattr(renderer, name))
+
+            frame = renderer.render(executor.cellList)
+            self.assertTrue((frame == referenceRenderer.render(executor.cellList)).all(), "step %d" % step)
+
+if __name__ == "__main__":
+    unittest.main()
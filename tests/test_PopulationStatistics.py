@@ -0,0 +1,123 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    energy2DModule = loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+except ImportError:
+    energy2DModule = None
+
+NO_MESSAGES = {"sent": 0, "delivered": 0, "dropped": 0}
+
+class SpawnerBrain:
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        self._environment.spawnCell(1, 0, IdleBrain(self._environment))
+
+class IdleBrain:
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        pass
+
+class SelfDeletingBrain:
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        self._environment.deleteCurrentCell()
+        self._environment.deleteCurrentCell()
+
+@unittest.skipIf(energy2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class PopulationStatisticsTest(unittest.TestCase):
+    def test_rowsAreKeptOldestFirstInARingBuffer(self):
+        statistics = energy2DModule.PopulationStatistics(capacity = 3, histogramBins = 4)
+        for step in range(5):
+            statistics.births = step
+            statistics.record(step, np.array([0.1, 0.6, 0.99, 1.5]), step * 2, {"sent": step, "delivered": step, "dropped": 0})
+
+        rows = statistics.getRows()
+        self.assertEqual(len(statistics), 3)
+        self.assertEqual([row["step"] for row in rows], [2, 3, 4])
+        self.assertEqual([row["births"] for row in rows], [2, 3, 4])
+        self.assertEqual(rows[0]["genomeDiversity"], 4)
+        self.assertEqual(rows[0]["population"], 4)
+        self.assertEqual(rows[0]["energyHistogram"], [1, 0, 1, 2])
+        self.assertAlmostEqual(rows[0]["meanEnergy"], 0.7975)
+
+    def test_countersResetAfterEachRow(self):
+        statistics = energy2DModule.PopulationStatistics()
+        statistics.deathsStarved = 2
+        statistics.energyTransferred = 0.25
+        statistics.record(1, np.zeros(0), 0, NO_MESSAGES)
+        statistics.record(2, np.zeros(0), 0, NO_MESSAGES)
+
+        firstRow, secondRow = statistics.getRows()
+        self.assertEqual(firstRow["deathsStarved"], 2)
+        self.assertEqual(firstRow["energyTransferred"], 0.25)
+        self.assertEqual(firstRow["meanEnergy"], 0.0)
+        self.assertEqual(secondRow["deathsStarved"], 0)
+
+    def test_csvAndJsonExports(self):
+        statistics = energy2DModule.PopulationStatistics(histogramBins = 2)
+        statistics.moves = 3
+        statistics.record(7, np.array([0.25, 0.75]), 2, NO_MESSAGES)
+
+        with tempfile.TemporaryDirectory() as directory:
+            csvPath = os.path.join(directory, "statistics.csv")
+            jsonPath = os.path.join(directory, "statistics.json")
+            statistics.writeCsv(csvPath)
+            statistics.writeJson(jsonPath)
+
+            with open(csvPath, newline="") as file:
+                csvRows = list(csv.DictReader(file))
+            with open(jsonPath) as file:
+                jsonRows = json.load(file)
+
+        self.assertEqual(jsonRows, statistics.getRows())
+        self.assertEqual(len(csvRows), 1)
+        self.assertEqual(csvRows[0]["step"], "7")
+        self.assertEqual(csvRows[0]["moves"], "3")
+        self.assertEqual((csvRows[0]["energyBin0"], csvRows[0]["energyBin1"]), ("1", "1"))
+
+    def test_environmentRecordsBirthsAndDeaths(self):
+        environment, executor = createWorld(energy2DModule.Energy2DEnvironment)
+        environment.enableStatistics()
+        environment._spawnCell(0, 0, SpawnerBrain(environment))
+        environment._spawnCell(0, 5, SelfDeletingBrain(environment))
+        environment._spawnCell(100, 0, IdleBrain(environment))
+        executor.step()
+
+        row = environment.getStatistics().getRows()[-1]
+        self.assertEqual(row["step"], 1)
+        self.assertEqual(row["births"], 1)
+        # deleting itself twice in one turn is one death
+        self.assertEqual(row["deathsSelf"], 1)
+        self.assertEqual(row["deathsLeftArena"], 1)
+        self.assertEqual(row["population"], len(executor.cellList))
+
+    def test_disablingKeepsTheRecordedRows(self):
+        environment, executor = createWorld(energy2DModule.Energy2DEnvironment)
+        environment.enableStatistics()
+        environment._spawnCell(0, 0, IdleBrain(environment))
+        executor.step()
+        executor.step()
+        environment.disableStatistics()
+        executor.step()
+
+        self.assertEqual(len(environment.getStatistics()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+except ImportError:
+    simple2DModule = None
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class CellMapTest(unittest.TestCase):
+    def setUp(self):
+        self.environment, self.executor = createWorld(simple2DModule.Simple2DEnvironment)
+        self.expectedCells = {}
+
+        # spawns and deletes across bucket borders and negative coordinates
+        randomStream = random.Random(3)
+        for index in range(5000):
+            # the area index is built on the first query and kept current from then on
+            if index == 2500:
+                self.environment.getCellsInArea(0, 0, 0, 0)
+            position = (randomStream.randint(-70, 70), randomStream.randint(-70, 70))
+            if randomStream.random() < 0.6:
+                self.environment._spawnCell(position[0], position[1], golModule.AliveCell(self.environment))
+                if position not in self.expectedCells:
+                    self.expectedCells[position] = self.environment._cellMap[position]
+            elif position in self.expectedCells:
+                self.environment._userRemoveCell(position)
+                del self.expectedCells[position]
+
+    def _getExpectedArea(self, left, top, right, bottom):
+        return sorted(id(cell) for (x, y), cell in self.expectedCells.items() if left <= x <= right and top <= y <= bottom)
+
+    def test_pointLookupsMatchTheSpawnedCells(self):
+        for x in range(-72, 73):
+            for y in range(-72, 73):
+                self.assertEqual(self.environment._checkForCellAbsolute(x, y), (x, y) in self.expectedCells)
+
+    def test_areaQueriesMatchAFullScan(self):
+        randomStream = random.Random(4)
+        for _ in range(200):
+            left = randomStream.randint(-90, 90)
+            top = randomStream.randint(-90, 90)
+            right = left + randomStream.randint(0, 80)
+            bottom = top + randomStream.randint(0, 80)
+            found = sorted(id(cell) for cell in self.environment.getCellsInArea(left, top, right, bottom))
+            self.assertEqual(found, self._getExpectedArea(left, top, right, bottom))
+
+    def test_emptyAndInvertedAreas(self):
+        self.assertEqual(self.environment.getCellsInArea(1000, 1000, 2000, 2000), [])
+        self.assertEqual(self.environment.getCellsInArea(10, 10, 0, 0), [])
+
+    def test_rebuildKeepsEveryCell(self):
+        self.environment._cellsChangedManually()
+        found = sorted(id(cell) for cell in self.environment.getCellsInArea(-100, -100, 100, 100))
+        self.assertEqual(found, self._getExpectedArea(-100, -100, 100, 100))
+        self.assertEqual(len(self.executor.cellList), len(self.expectedCells))
+
+    def test_clearingEmptiesTheMap(self):
+        self.executor.clearCells()
+        self.assertEqual(self.environment.getCellsInArea(-100, -100, 100, 100), [])
+        self.assertFalse(self.environment._checkForCellAbsolute(0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
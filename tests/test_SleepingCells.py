@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+addSimulatorPath()
+try:
+    simple2DModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    simple3DModule = loadModule("Simple3D/environments/Simple3DEnvironment/Simple3DEnvironment.py")
+except ImportError:
+    simple2DModule = None
+
+class SleeperBrain:
+    def __init__(self, environment):
+        self._environment = environment
+        self.runCount = 0
+
+    def run(self):
+        self.runCount += 1
+        self._environment.sleepCurrentCell()
+
+class IdleBrain:
+    def __init__(self, environment):
+        self._environment = environment
+
+    def run(self):
+        pass
+
+class NeighborSpawnerBrain:
+    # spawns a cell to its right on every run, after any sleeper to its left has run
+    def __init__(self, environment):
+        self._environment = environment
+        self.spawnCount = 0
+
+    def run(self):
+        self.spawnCount += 1
+        self._environment.spawnCell(self.spawnCount, 0, IdleBrain(self._environment))
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class Simple2DSleepTest(unittest.TestCase):
+    def setUp(self):
+        self.environment, self.executor = createWorld(simple2DModule.Simple2DEnvironment)
+        self.sleeper = SleeperBrain(self.environment)
+        self.environment._spawnCell(0, 0, self.sleeper)
+
+    def test_sleepingCellSkipsItsTurnsButStaysInTheExecutor(self):
+        for _ in range(5):
+            self.executor.step()
+
+        self.assertEqual(self.sleeper.runCount, 1)
+        self.assertEqual(len(self.executor.cellList), 1)
+        self.assertEqual(len(self.environment.getCellsInArea(0, 0, 0, 0)), 1)
+
+    def test_changeNextToASleeperWakesIt(self):
+        self.executor.step()
+        self.environment._spawnCell(1, 1, IdleBrain(self.environment))
+        self.executor.step()
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 2)
+
+        # changes between steps are picked up at the end of the next step
+        self.environment._userRemoveCell((1, 1))
+        self.executor.step()
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 3)
+
+    def test_distantChangeDoesNotWakeASleeper(self):
+        self.executor.step()
+        self.environment._spawnCell(2, 0, IdleBrain(self.environment))
+        self.environment._spawnCell(-5, 7, IdleBrain(self.environment))
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 1)
+
+    def test_changeAfterTheCellRanKeepsItAwake(self):
+        # the spawner runs after the sleeper in the same step and puts a cell next to it
+        self.environment._spawnCell(-2, 0, NeighborSpawnerBrain(self.environment))
+        self.executor.step()
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 2)
+
+    def test_deletedSleeperIsDropped(self):
+        self.executor.step()
+        self.environment._userRemoveCell((0, 0))
+        self.environment._spawnCell(0, 0, IdleBrain(self.environment))
+        self.executor.step()
+        self.executor.step()
+
+        self.assertEqual(self.sleeper.runCount, 1)
+        self.assertEqual(len(self.executor.cellList), 1)
+
+    def test_manualChangesWakeEveryCell(self):
+        self.executor.step()
+        self.environment._cellsChangedManually()
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 2)
+
+@unittest.skipIf(simple2DModule == None, "needs the simulator's base_classes, pass its path in OCL_SIMULATOR_PATH")
+class Simple3DSleepTest(unittest.TestCase):
+    def setUp(self):
+        self.environment, self.executor = createWorld(simple3DModule.Simple3DEnvironment)
+        self.sleeper = SleeperBrain(self.environment)
+        self.environment._spawnCell(0, 0, 0, self.sleeper)
+
+    def test_sleepingCellSkipsItsTurnsButStaysInTheExecutor(self):
+        for _ in range(5):
+            self.executor.step()
+
+        self.assertEqual(self.sleeper.runCount, 1)
+        self.assertEqual(len(self.executor.cellList), 1)
+
+    def test_changeNextToASleeperWakesIt(self):
+        self.executor.step()
+        self.environment._spawnCell(3, 0, 0, IdleBrain(self.environment))
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 1)
+
+        self.environment._spawnCell(1, -1, 1, IdleBrain(self.environment))
+        self.executor.step()
+        self.executor.step()
+        self.assertEqual(self.sleeper.runCount, 2)
+
+if __name__ == "__main__":
+    unittest.main()
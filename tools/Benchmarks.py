@@ -0,0 +1,175 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from HeadlessExecutor import addSimulatorPath, loadModule, createWorld
+
+gosperGliderGun = [
+    "........................O...........",
+    "......................O.O...........",
+    "............OO......OO............OO",
+    "...........O...O....OO............OO",
+    "OO........O.....O...OO..............",
+    "OO........O...O.OO....O.O...........",
+    "..........O.....O.......O...........",
+    "...........O...O....................",
+    "............OO......................"
+]
+
+def parsePattern(rows):
+    return [(x, y) for y, row in enumerate(rows) for x, character in enumerate(row) if character == "O"]
+
+def setupGliderGun(bulk, renderer = None, seed = None):
+    environmentModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    golModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/GoL/GoL.py")
+    environment, executor = createWorld(environmentModule.Simple2DEnvironment, renderer, seed)
+    if bulk:
+        environment._toggleBulkLife()
+    for xPosition, yPosition in parsePattern(gosperGliderGun):
+        environment._spawnCell(xPosition, yPosition, golModule.AliveCell(environment))
+    return environment, executor
+
+def setupVirusFlood(renderer = None, seed = None):
+    environmentModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    virusModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/Virus/Virus.py")
+    environment, executor = createWorld(environmentModule.Simple2DEnvironment, renderer, seed)
+    environment._spawnCell(0, 0, virusModule.Virus(environment))
+    return environment, executor
+
+def setupRandomWalk(renderer = None, seed = None):
+    environmentModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    randomWalkModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/RandomWalk/RandomWalk.py")
+    environment, executor = createWorld(environmentModule.Simple2DEnvironment, renderer, seed)
+    # single walkers trap themselves quickly, so a grid of them keeps the trail growing
+    for xPosition in range(0, 400, 50):
+        for yPosition in range(0, 400, 50):
+            environment._spawnCell(xPosition, yPosition, randomWalkModule.RandomWalk(environment))
+    return environment, executor
+
+def setupWireWorldClock(renderer = None, seed = None):
+    environmentModule = loadModule("Simple2D/environments/Simple2DEnvironment/Simple2DEnvironment.py")
+    wireWorldModule = loadModule("Simple2D/environments/Simple2DEnvironment/cellPacks/WireWorld/WireWorld.py")
+    environment, executor = createWorld(environmentModule.Simple2DEnvironment, renderer, seed)
+
+    loopWidth = 12
+    loopHeight = 6
+    layout = {}
+    for xPosition in range(loopWidth):
+        layout[(xPosition, 0)] = wireWorldModule.Wire
+        layout[(xPosition, loopHeight - 1)] = wireWorldModule.Wire
+    for yPosition in range(loopHeight):
+        layout[(0, yPosition)] = wireWorldModule.Wire
+        layout[(loopWidth - 1, yPosition)] = wireWorldModule.Wire
+    for xPosition in range(loopWidth, loopWidth + 200):
+        layout[(xPosition, loopHeight // 2)] = wireWorldModule.Wire
+    layout[(2, 0)] = wireWorldModule.Head
+    layout[(1, 0)] = wireWorldModule.Tail
+
+    for (xPosition, yPosition), brainClass in layout.items():
+        environment._spawnCell(xPosition, yPosition, brainClass(environment))
+    return environment, executor
+
+def setupGeneticPopulation(renderer = None, seed = None):
+    environmentModule = loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+    geneticModule = loadModule("Simple2D/environments/Energy2DEnvironment/CellPacks/GeneticCell.py")
+    environment, executor = createWorld(environmentModule.Energy2DEnvironment, renderer, seed)
+    # the starting layout is drawn from the environment's stream, so the seed decides it as well
+    randomStream = environment.getRandom()
+    for xPosition in range(-10, 10):
+        for yPosition in range(-10, 10):
+            if randomStream.random() < 0.5:
+                environment._spawnCell(xPosition, yPosition, geneticModule.GeneticCell(environment))
+    return environment, executor
+
+workloads = {
+    "gol-glider-gun": (lambda renderer = None, seed = None: setupGliderGun(False, renderer, seed), 300),
+    "gol-glider-gun-bulk": (lambda renderer = None, seed = None: setupGliderGun(True, renderer, seed), 100),
+    "virus-flood": (setupVirusFlood, 60),
+    "random-walk": (setupRandomWalk, 2000),
+    "wireworld-clock": (setupWireWorldClock, 1000),
+    "genetic-population": (setupGeneticPopulation, 100)
+}
+
+def runWorkload(name, seed, steps, measureMemory):
+    setup, defaultSteps = workloads[name]
+    if steps == None:
+        steps = defaultSteps
+
+    gc.collect()
+    if measureMemory:
+        tracemalloc.start()
+
+    environment, executor = setup(seed=seed)
+    peakCells = len(executor.cellList)
+
+    startTime = time.perf_counter()
+    for _ in range(steps):
+        executor.step()
+        peakCells = max(peakCells, len(executor.cellList))
+    elapsed = time.perf_counter() - startTime
+
+    result = {
+        "workload": name,
+        "seed": seed,
+        "steps": steps,
+        "seconds": elapsed,
+        "stepsPerSecond": steps / elapsed if elapsed > 0 else None,
+        "cellUpdates": executor.cellUpdates,
+        "cellUpdatesPerSecond": executor.cellUpdates / elapsed if elapsed > 0 else None,
+        "finalCells": len(executor.cellList),
+        "peakCells": peakCells
+    }
+
+    if measureMemory:
+        currentMemory, peakMemory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peakMemoryBytes"] = peakMemory
+        result["bytesPerCell"] = currentMemory / result["finalCells"] if result["finalCells"] > 0 else None
+
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the 2D cell packs.")
+    parser.add_argument("workloads", nargs="*", default=list(workloads.keys()), help="workloads to run (default: all)")
+    parser.add_argument("--simulator", help="path to the OpenCellLab simulator (defaults to $OCL_SIMULATOR_PATH)")
+    parser.add_argument("--steps", type=int, help="override the number of steps for every workload")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    arguments = parser.parse_args()
+
+    addSimulatorPath(arguments.simulator)
+
+    results = []
+    for name in arguments.workloads:
+        if name not in workloads:
+            parser.error("unknown workload: " + name)
+
+        # timings come from an untraced run since tracemalloc slows allocation-heavy workloads down
+        result = runWorkload(name, arguments.seed, arguments.steps, False)
+        if not arguments.no_memory:
+            memoryResult = runWorkload(name, arguments.seed, arguments.steps, True)
+            result["peakMemoryBytes"] = memoryResult["peakMemoryBytes"]
+            result["bytesPerCell"] = memoryResult["bytesPerCell"]
+        results.append(result)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results
+    }
+
+    if arguments.output == None:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    else:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+if __name__ == "__main__":
+    main()
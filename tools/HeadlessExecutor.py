@@ -0,0 +1,102 @@
+import importlib.util
+import os
+import sys
+
+repositoryRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceRoot = os.path.join(repositoryRoot, "src")
+
+def addSimulatorPath(simulatorPath = None):
+    # base_classes and ExportFunctions ship with the simulator, not with this repository
+    if simulatorPath == None:
+        simulatorPath = os.environ.get("OCL_SIMULATOR_PATH")
+    if simulatorPath != None and simulatorPath not in sys.path:
+        sys.path.insert(0, simulatorPath)
+
+loadedModules = {}
+
+def loadModule(relativePath):
+    if relativePath in loadedModules:
+        return loadedModules[relativePath]
+
+    path = os.path.join(sourceRoot, relativePath)
+    moduleName = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(moduleName, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    loadedModules[relativePath] = module
+    return module
+
+class HeadlessRenderer:
+    def __init__(self):
+        self.backgroundColor = (0, 0, 0)
+        self.cellSource = None
+
+    def setBackgroundColor(self, colorTuple):
+        self.backgroundColor = colorTuple
+
+    def setCellSource(self, cellSource):
+        self.cellSource = cellSource
+
+class HeadlessExecutor:
+    def __init__(self, environment):
+        self.cellList = []
+        self.currentCell = None
+        self.selectedCellBrainReference = None
+        self.cellUpdates = 0
+
+        self._environment = environment
+        self._removedCells = set()
+        environment._cellExecutor = self
+
+    def addCell(self, cell):
+        self.cellList.append(cell)
+
+    def addCells(self, cells):
+        self.cellList.extend(cells)
+
+    def removeCell(self, cell):
+        if cell in self.cellList:
+            self.cellList.remove(cell)
+            self._removedCells.add(cell)
+
+    def removeCells(self, cells):
+        # one pass over the list instead of a list.remove() per cell
+        removedCells = set(cells)
+        remainingCells = [cell for cell in self.cellList if cell not in removedCells]
+        if len(remainingCells) != len(self.cellList):
+            self._removedCells.update(removedCells)
+            self.cellList[:] = remainingCells
+
+    def clearCells(self):
+        self.cellList = []
+        self._environment._executorClearedCells()
+
+    def cellsChangedManually(self):
+        self._environment._cellsChangedManually()
+
+    def step(self):
+        self._removedCells = set()
+        for cell in list(self.cellList):
+            if cell in self._removedCells:
+                continue
+
+            self.currentCell = cell
+            self._environment._cellSwitched()
+            if cell in self._removedCells:
+                continue
+
+            cell.cellBrain.run()
+            self.cellUpdates += 1
+
+        self.currentCell = None
+        self._environment._cellsCycled()
+
+def createWorld(environmentClass, renderer = None, seed = None):
+    if renderer == None:
+        renderer = HeadlessRenderer()
+    environment = environmentClass(renderer)
+    # the same seed gives the same run, None draws a fresh one
+    if hasattr(environment, "setRandomSeed"):
+        environment.setRandomSeed(seed)
+    executor = HeadlessExecutor(environment)
+    return environment, executor
@@ -0,0 +1,126 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from HeadlessExecutor import addSimulatorPath, loadModule
+from Benchmarks import setupGeneticPopulation
+
+PARAMETERS = ("topEnergy", "bottomEnergy", "arenaSize")
+
+def parseValues(text):
+    # "5,10,20" lists values, "0:50:10" is an inclusive range with a step
+    if ":" in text:
+        parts = [int(part) for part in text.split(":")]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(range(parts[0], parts[1] + 1, step))
+    return [int(part) for part in text.split(",")]
+
+def configurationKey(configuration):
+    return tuple(configuration[name] for name in PARAMETERS + ("seed", "steps"))
+
+def buildConfigurations(values, seeds, steps, samples, sampleSeed):
+    if samples == None:
+        parameterSets = itertools.product(*(values[name] for name in PARAMETERS))
+    else:
+        # random sampling draws every parameter uniformly between the smallest and largest given value
+        sampler = random.Random(sampleSeed)
+        parameterSets = [tuple(sampler.randint(min(values[name]), max(values[name])) for name in PARAMETERS) for _ in range(samples)]
+
+    configurations = []
+    for parameterSet in parameterSets:
+        for seed in seeds:
+            configuration = dict(zip(PARAMETERS, parameterSet))
+            configuration["seed"] = seed
+            configuration["steps"] = steps
+            configurations.append(configuration)
+    return configurations
+
+def readFinishedKeys(path):
+    finishedKeys = set()
+    if not os.path.exists(path):
+        return finishedKeys
+    with open(path) as file:
+        for line in file:
+            try:
+                finishedKeys.add(configurationKey(json.loads(line)))
+            except (ValueError, KeyError):
+                # the last line can be cut off when a sweep is interrupted
+                continue
+    return finishedKeys
+
+def runConfiguration(configuration):
+    environment, executor = setupGeneticPopulation(seed=configuration["seed"])
+    environment._setTopEnergy(configuration["topEnergy"])
+    environment._setBottomEnergy(configuration["bottomEnergy"])
+    environment._setArenaSize(configuration["arenaSize"])
+
+    peakPopulation = len(executor.cellList)
+    survivalSteps = 0
+    startTime = time.perf_counter()
+    while survivalSteps < configuration["steps"] and len(executor.cellList) > 0:
+        executor.step()
+        survivalSteps += 1
+        peakPopulation = max(peakPopulation, len(executor.cellList))
+
+    result = dict(configuration)
+    result["survivalSteps"] = survivalSteps
+    result["extinct"] = len(executor.cellList) == 0
+    result["peakPopulation"] = peakPopulation
+    result["finalPopulation"] = len(executor.cellList)
+    result["finalDiversity"] = environment.getGenomePool().getDiversity()
+    result["seconds"] = time.perf_counter() - startTime
+
+    # worlds are full of reference cycles, collect them before the worker starts the next run
+    del environment, executor
+    gc.collect()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Energy2DEnvironment parameters over GeneticCell populations in parallel.")
+    parser.add_argument("output", help="JSON lines file, runs already in it are skipped")
+    parser.add_argument("--simulator", help="path to the OpenCellLab simulator (defaults to $OCL_SIMULATOR_PATH)")
+    parser.add_argument("--top", default="0:50:10", help="peak positive energy slider values, e.g. 5,10,20 or 0:50:10")
+    parser.add_argument("--bottom", default="0:50:10", help="peak negative energy slider values")
+    parser.add_argument("--arena", default="25", help="arena size slider values")
+    parser.add_argument("--seeds", type=int, default=1, help="number of seeds per configuration, starting at 0")
+    parser.add_argument("--steps", type=int, default=1000, help="steps per run, runs stop early once the population dies out")
+    parser.add_argument("--samples", type=int, help="draw this many random configurations instead of the full grid")
+    parser.add_argument("--sample-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arguments = parser.parse_args()
+
+    addSimulatorPath(arguments.simulator)
+    # fail early in the parent if the simulator classes can not be found
+    loadModule("Simple2D/environments/Energy2DEnvironment/Energy2DEnvironment.py")
+
+    values = {"topEnergy": parseValues(arguments.top), "bottomEnergy": parseValues(arguments.bottom), "arenaSize": parseValues(arguments.arena)}
+    configurations = buildConfigurations(values, range(arguments.seeds), arguments.steps, arguments.samples, arguments.sample_seed)
+    finishedKeys = readFinishedKeys(arguments.output)
+    pendingConfigurations = [configuration for configuration in configurations if configurationKey(configuration) not in finishedKeys]
+    print("%d runs, %d already done, %d to go on %d workers" % (len(configurations), len(configurations) - len(pendingConfigurations), len(pendingConfigurations), arguments.workers), file=sys.stderr)
+
+    with open(arguments.output, "a") as outputFile:
+        if outputFile.tell() > 0:
+            # an interrupted write may have left half a line behind
+            with open(arguments.output, "rb") as existingFile:
+                existingFile.seek(-1, os.SEEK_END)
+                if existingFile.read(1) != b"\n":
+                    outputFile.write("\n")
+
+        startTime = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=arguments.workers, initializer=addSimulatorPath, initargs=(arguments.simulator,)) as pool:
+            futures = [pool.submit(runConfiguration, configuration) for configuration in pendingConfigurations]
+            for completed, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                outputFile.write(json.dumps(result) + "\n")
+                outputFile.flush()
+                print("[%d/%d] top %d, bottom %d, arena %d, seed %d: survived %d steps, peak %d, diversity %d (%.1fs elapsed)" % (completed, len(futures), result["topEnergy"], result["bottomEnergy"], result["arenaSize"], result["seed"], result["survivalSteps"], result["peakPopulation"], result["finalDiversity"], time.perf_counter() - startTime), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
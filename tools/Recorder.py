@@ -0,0 +1,239 @@
+import argparse
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from io import BytesIO
+
+from PIL import GifImagePlugin
+
+from HeadlessExecutor import addSimulatorPath, loadModule
+from Benchmarks import workloads
+
+def pngChunk(chunkType, data):
+    return struct.pack(">I", len(data)) + chunkType + data + struct.pack(">I", zlib.crc32(chunkType + data) & 0xFFFFFFFF)
+
+def readPngChunks(data):
+    position = 8
+    while position < len(data):
+        length = struct.unpack(">I", data[position:position + 4])[0]
+        chunkType = data[position + 4:position + 8]
+        yield chunkType, data[position + 8:position + 8 + length]
+        position += length + 12
+
+class APNGWriter:
+    # frames are appended as fcTL/fdAT chunks, so only the frame being encoded is ever held in memory
+    def __init__(self, path, frameDuration, compressLevel = 6):
+        self._file = open(path, "wb")
+        self._frameDuration = frameDuration
+        self._compressLevel = compressLevel
+        self._mode = None
+        self._size = None
+        self._frameCount = 0
+        self._sequenceNumber = 0
+        self._animationControlPosition = None
+
+    def write(self, image):
+        if self._mode == None:
+            self._mode = "RGBA" if image.mode in ("RGBA", "LA", "PA") else "RGB"
+            self._size = image.size
+        if image.mode != self._mode:
+            image = image.convert(self._mode)
+        if image.size != self._size:
+            image = image.resize(self._size)
+
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", compress_level=self._compressLevel)
+        chunks = list(readPngChunks(buffer.getvalue()))
+
+        if self._frameCount == 0:
+            self._file.write(b"\x89PNG\r\n\x1a\n")
+            self._file.write(pngChunk(b"IHDR", dict(chunks)[b"IHDR"]))
+            self._animationControlPosition = self._file.tell()
+            self._file.write(pngChunk(b"acTL", struct.pack(">II", 0, 0)))
+
+        self._file.write(pngChunk(b"fcTL", struct.pack(">IIIIIHHBB", self._sequenceNumber, self._size[0], self._size[1], 0, 0, int(self._frameDuration), 1000, 0, 0)))
+        self._sequenceNumber += 1
+        for chunkType, data in chunks:
+            if chunkType != b"IDAT":
+                continue
+            if self._frameCount == 0:
+                self._file.write(pngChunk(b"IDAT", data))
+            else:
+                self._file.write(pngChunk(b"fdAT", struct.pack(">I", self._sequenceNumber) + data))
+                self._sequenceNumber += 1
+        self._frameCount += 1
+
+    def close(self):
+        if self._frameCount > 0:
+            self._file.write(pngChunk(b"IEND", b""))
+            # the frame count is only known now, so the placeholder acTL chunk is patched in place
+            self._file.seek(self._animationControlPosition)
+            self._file.write(pngChunk(b"acTL", struct.pack(">II", self._frameCount, 0)))
+        self._file.close()
+
+class GIFWriter:
+    def __init__(self, path, frameDuration):
+        self._file = open(path, "wb")
+        self._frameDuration = frameDuration
+        self._size = None
+
+    def write(self, image):
+        image = image.convert("RGB")
+        if self._size == None:
+            self._size = image.size
+        elif image.size != self._size:
+            image = image.resize(self._size)
+
+        # every frame carries its own color table, so palettes never have to be known up front
+        frame = image.quantize(256)
+        if self._file.tell() == 0:
+            header, _ = GifImagePlugin.getheader(frame.copy(), info={"loop": 0})
+            for fragment in header:
+                self._file.write(fragment)
+        for fragment in GifImagePlugin.getdata(frame, duration=self._frameDuration, include_color_table=True):
+            self._file.write(fragment)
+
+    def close(self):
+        if self._file.tell() > 0:
+            self._file.write(b";")
+        self._file.close()
+
+class RawWriter:
+    # headerless RGB frames, e.g. for "ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -i -"
+    def __init__(self, path):
+        if path == "-":
+            self._file = sys.stdout.buffer
+            self._ownsFile = False
+        else:
+            self._file = open(path, "wb")
+            self._ownsFile = True
+
+    def write(self, image):
+        self._file.write(image.convert("RGB").tobytes())
+
+    def close(self):
+        self._file.flush()
+        if self._ownsFile:
+            self._file.close()
+
+class Recorder:
+    # "drop" never stalls the simulation and skips frames while the queue is full, "block" waits for the encoder instead
+    POLICIES = ("drop", "block")
+
+    def __init__(self, writer, queueSize = 16, policy = "drop"):
+        if policy not in Recorder.POLICIES:
+            raise ValueError("Unknown queue policy: " + str(policy))
+
+        self._writer = writer
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._policy = policy
+        self._encoderError = None
+        self._thread = threading.Thread(target=self._encodeFrames, daemon=True)
+
+        self.framesSubmitted = 0
+        self.framesWritten = 0
+        self.framesDropped = 0
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, image):
+        if self._encoderError != None:
+            raise self._encoderError
+
+        self.framesSubmitted += 1
+        if self._policy == "block":
+            self._queue.put(image)
+            return True
+
+        try:
+            self._queue.put_nowait(image)
+        except queue.Full:
+            self.framesDropped += 1
+            return False
+        return True
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.close()
+        if self._encoderError != None:
+            raise self._encoderError
+
+    def _encodeFrames(self):
+        while True:
+            image = self._queue.get()
+            if image is None:
+                return
+            if self._encoderError != None:
+                continue
+            try:
+                self._writer.write(image)
+                self.framesWritten += 1
+            except Exception as error:
+                self._encoderError = error
+
+def createWriter(outputFormat, path, frameDuration):
+    if outputFormat == "apng":
+        return APNGWriter(path, frameDuration)
+    if outputFormat == "gif":
+        return GIFWriter(path, frameDuration)
+    return RawWriter(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a headless simulation run to APNG, GIF or raw RGB frames.")
+    parser.add_argument("workload", choices=list(workloads.keys()))
+    parser.add_argument("output", help="output file, or - for raw frames on stdout")
+    parser.add_argument("--simulator", help="path to the OpenCellLab simulator (defaults to $OCL_SIMULATOR_PATH)")
+    parser.add_argument("--format", choices=["apng", "gif", "raw"], help="output format (default: guessed from the file extension)")
+    parser.add_argument("--steps", type=int, help="number of simulation steps (default: the workload's benchmark length)")
+    parser.add_argument("--every", type=int, default=1, help="render every N steps")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--scale", type=float, default=4, help="pixels per cell, powers of two below 1 zoom out further")
+    parser.add_argument("--frame-duration", type=int, default=50, help="milliseconds per frame")
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--policy", choices=Recorder.POLICIES, default="drop")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    outputFormat = arguments.format
+    if outputFormat == None:
+        outputFormat = "gif" if arguments.output.lower().endswith(".gif") else "apng" if arguments.output.lower().endswith(".png") else "raw"
+    if outputFormat == "apng" and arguments.output == "-":
+        parser.error("APNG output needs a seekable file")
+
+    addSimulatorPath(arguments.simulator)
+    rendererClass = loadModule("Simple2D/Simple2DRenderer.py").Simple2DRenderer
+    renderer = rendererClass(arguments.width, arguments.height)
+    renderer.setScale(arguments.scale)
+    renderer.setOutputEncoding("image")
+
+    setup, defaultSteps = workloads[arguments.workload]
+    steps = arguments.steps if arguments.steps != None else defaultSteps
+    environment, executor = setup(renderer, arguments.seed)
+
+    recorder = Recorder(createWriter(outputFormat, arguments.output, arguments.frame_duration), arguments.queue_size, arguments.policy)
+    recorder.start()
+
+    # frames are drawn from step snapshots on the renderer's worker thread while the next steps run
+    startTime = time.perf_counter()
+    pendingFrame = None
+    for step in range(steps):
+        executor.step()
+        if step % arguments.every == 0:
+            if pendingFrame != None:
+                recorder.submit(pendingFrame.result())
+            pendingFrame = renderer.renderAsync(environment.getSnapshot())
+    if pendingFrame != None:
+        recorder.submit(pendingFrame.result())
+    simulationSeconds = time.perf_counter() - startTime
+    recorder.close()
+
+    print("steps: %d, frames written: %d, dropped: %d, simulation: %.2fs, total: %.2fs" % (steps, recorder.framesWritten, recorder.framesDropped, simulationSeconds, time.perf_counter() - startTime), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()